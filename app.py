@@ -1,33 +1,401 @@
-import sys
+import argparse
 from pathlib import Path
 
-from camfixer.block_generator import block_generator
-from camfixer.save_cam import save_cam
+from camfixer.is_cam_analysis import is_cam_analysis
+from camfixer.result_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, ResultCache
+from camfixer.stage_metrics import NO_METRICS, StageMetrics
+from camfixer.tessellate_path import CHORD_TOLERANCE
 # from camfixer.es_pieza import es_pieza
 
 
-def main():
+def positive_float(text):
+    """Argparse type of the tolerance: a float greater than zero."""
+    value = float(text)
+    if not value > 0:
+        raise argparse.ArgumentTypeError(f"tiene que ser mayor que cero: {text}")
+    return value
+
+
+def positive_int(text):
+    """Argparse type of the fixed-point decimals: an integer of at least 1."""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"tiene que ser al menos 1: {text}")
+    return value
+
+
+def parse_args(argv=None):
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Corrige las entradas de corte de los archivos .CAM."
+    )
+    parser.add_argument("input", nargs="?", help="Archivo .CAM a corregir.")
+    parser.add_argument(
+        "-o", "--output", default="output.cam", help="Archivo .CAM corregido."
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="DIR_O_GLOB",
+        help="Directorio o patron glob con los archivos .CAM a corregir en paralelo.",
+    )
+    parser.add_argument(
+        "--watch",
+        metavar="BANDEJA",
+        help="Queda corriendo y corrige cada archivo .CAM que se deja en el directorio BANDEJA.",
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="PUERTO",
+        type=int,
+        nargs="?",
+        const=8765,
+        help="Queda corriendo como servidor HTTP local: POST /fix corrige el programa enviado, "
+        "GET /metrics muestra latencias y rendimiento (puerto por defecto: 8765).",
+    )
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Direccion del servidor HTTP (default: 127.0.0.1, solo esta maquina).",
+    )
+    parser.add_argument(
+        "--output-dir",
+        default="output",
+        help="Directorio de salida de los modos batch y watch (default: output).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Procesos del modo batch, watch o serve, o que corrigen las entradas de un archivo grande (default: uno por CPU).",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        help="Archivos en espera del modo watch antes de dejar de leer la bandeja (default: 64).",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        help="Segundos entre lecturas de la bandeja del modo watch (default: 0.1).",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=positive_float,
+        default=CHORD_TOLERANCE,
+        help=f"Tolerancia de cuerda de los arcos en mm (default: {CHORD_TOLERANCE}).",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Solo informa los bloques con el arco del lado equivocado, sin corregir.",
+    )
+    parser.add_argument(
+        "--optimize-order",
+        action="store_true",
+        help="Cambia el orden de corte para acortar los movimientos en vacio, "
+        "cortando siempre los agujeros antes que su pieza.",
+    )
+    parser.add_argument(
+        "--fixed-point",
+        metavar="DECIMALES",
+        type=positive_int,
+        nargs="?",
+        const=1,
+        help="Lee las coordenadas como enteros con DECIMALES decimales (default: 1, decimas de mm), "
+        "asi las que no cambian se escriben exactamente como se leyeron.",
+    )
+    parser.add_argument(
+        "--incremental",
+        metavar="ESTADO_JSON",
+        help="Reutiliza los bloques sin cambios desde la corrida anterior guardada en ESTADO_JSON.",
+    )
+    parser.add_argument(
+        "--save-analysis",
+        metavar="ARCHIVO_CAMA",
+        help="Guarda el programa analizado en un archivo binario y termina; "
+        "ese archivo se puede corregir o revisar despues sin volver a leer el texto.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Muestra el tiempo y las llamadas de cada etapa al terminar.",
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="ARCHIVO_JSON",
+        help="Guarda las metricas de cada etapa en un archivo JSON.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help=f"Directorio de la cache de archivos corregidos (default: {DEFAULT_CACHE_DIR}).",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=float,
+        default=DEFAULT_MAX_BYTES / 1024 / 1024,
+        help=f"Tamano maximo de la cache en MB (default: {DEFAULT_MAX_BYTES // 1024 // 1024}).",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Corrige los archivos sin usar la cache."
+    )
+    parser.add_argument(
+        "--cache-info", action="store_true", help="Muestra el estado de la cache y termina."
+    )
+    parser.add_argument(
+        "--clear-cache", action="store_true", help="Vacia la cache y termina."
+    )
+    args = parser.parse_args(argv)
+    if args.cache_info or args.clear_cache:
+        return args
+    if [args.input, args.batch, args.watch, args.serve].count(None) != 3:
+        parser.error(
+            "Uso: python app.py archivo.cam | python app.py --batch DIR_O_GLOB"
+            " | python app.py --watch BANDEJA | python app.py --serve [PUERTO]"
+        )
+    if args.optimize_order and args.incremental:
+        # The incremental mode writes the reused blocks where they were, in the order of the file.
+        parser.error("--optimize-order no se puede usar con --incremental")
+    return args
+
+
+def print_profile(metrics):
+    """Prints the time, calls and share of each stage, and the counters of the run."""
+    data = metrics.to_dict()
+    total = sum(stage["seconds"] for stage in data["stages"].values())
+    print(f"{'etapa':<12} {'segundos':>9} {'llamadas':>9} {'%':>6}")
+    for name, stage in data["stages"].items():
+        share = 100 * stage["seconds"] / total if total else 0.0
+        print(f"{name:<12} {stage['seconds']:>9.3f} {stage['calls']:>9} {share:>6.1f}")
+    counters = data["counters"]
+    print(
+        f"{counters.get('blocks', 0)} bloques ({counters.get('blocks_modified', 0)} modificados) "
+        f"en {data['seconds']:.2f} s: {data['blocks_per_second']:.0f} bloques/s"
+    )
+    if data["peak_memory_mb"] is not None:
+        print(f"Memoria maxima: {data['peak_memory_mb']:.1f} MB")
+
+
+def print_cut_order(metrics):
+    """Prints the rapid distance before and after optimize_cut_order, from its counters."""
+    counters = metrics.counters
+    # A fixed file taken from the cache was not reordered again.
+    if "rapid_mm_before" not in counters:
+        return
+    before, after = counters["rapid_mm_before"], counters["rapid_mm_after"]
+    saved = 100 * (before - after) / before if before else 0.0
+    print(f"Recorrido en vacio: {before} mm antes, {after} mm despues ({saved:.1f}% menos).")
+
+
+def report_metrics(args, metrics):
+    """Prints the profile and saves the metrics file, if they were requested."""
+    if args.optimize_order:
+        print_cut_order(metrics)
+    if args.profile:
+        print_profile(metrics)
+    if args.metrics:
+        metrics.save(args.metrics)
+        print(f"Metricas guardadas en {args.metrics}")
+
+
+def run_cache(args, cache):
+    """Prints the state of the cache, after clearing it if it was requested."""
+    if args.clear_cache:
+        print(f"Se eliminaron {cache.clear()} archivos de la cache.")
+    info = cache.info()
+    print(
+        f"Cache {info['directory']}: {info['entries']} archivos, "
+        f"{info['bytes'] / 1024 / 1024:.1f} de {info['max_bytes'] / 1024 / 1024:.0f} MB"
+    )
+    return 0
+
+
+def run_check(args):
+    """Prints the blocks whose lead-in has to be fixed; exits with 1 if there are any."""
+    from camfixer.check_cam import check_cam
+
+    n_blocks, to_fix = check_cam(args.input, args.tolerance)
+    for num_block, is_piece in to_fix:
+        if is_piece:
+            print(f"El bloque {num_block} es un agujero y tiene el arco por fuera.")
+        else:
+            print(f"El bloque {num_block} es una pieza exterior y tiene el arco por dentro.")
+    print(f"{n_blocks} bloques, {len(to_fix)} a corregir.")
+    return 1 if to_fix else 0
+
+
+def run_analysis(args, metrics=NO_METRICS):
+    """Saves the analysis of a cam file, or reports or fixes an analysis file saved before."""
+    from camfixer.cam_analysis import CamAnalysis, analyze_cam
+
+    if args.save_analysis:
+        analysis = analyze_cam(args.input, args.tolerance, metrics, args.fixed_point)
+        analysis.save(args.save_analysis)
+        metrics.stop()
+        print(f"Analisis guardado en {args.save_analysis}")
+        summary = analysis.summary()
+    else:
+        with CamAnalysis.load(args.input) as analysis:
+            summary = analysis.summary()
+    print(
+        f"{summary['blocks']} bloques: {summary['holes']} agujeros, "
+        f"{summary['circles']} circunferencias, {summary['to_fix']} a corregir."
+    )
+    if args.save_analysis:
+        report_metrics(args, metrics)
+        return 0
+    if args.check:
+        return 1 if summary["to_fix"] else 0
+
+    from camfixer.fix_cam import fix_cam_analysis
+
+    fix_cam_analysis(args.input, args.output, metrics, args.workers, args.optimize_order)
+    report_metrics(args, metrics)
+    return 0
+
+
+def run_incremental(args, metrics=NO_METRICS):
+    """Fixes only the blocks that changed since the last run and prints the summary."""
+    from camfixer.fix_cam_incremental import fix_cam_incremental
+
+    summary = fix_cam_incremental(
+        Path(args.input), args.output, args.incremental, args.tolerance, metrics, args.fixed_point
+    )
+    print(
+        f"{summary['blocks']} bloques: {summary['reused']} reutilizados, "
+        f"{summary['fixed']} corregidos de nuevo ({summary['added']} nuevos o cambiados, "
+        f"{summary['removed']} eliminados)"
+    )
+    report_metrics(args, metrics)
+    return 0
+
+
+def run_batch(args, metrics=NO_METRICS, cache=None):
+    """Fixes every cam file of the batch in parallel and prints the summary."""
+    from camfixer.fix_cam_batch import find_cam_files, fix_cam_batch
+
+    input_filepaths = find_cam_files(args.batch)
+    if not input_filepaths:
+        print(f"No se encontraron archivos .CAM en {args.batch}")
+        return 1
+
+    print(f"Corrigiendo {len(input_filepaths)} archivos .CAM...")
+    summary = fix_cam_batch(
+        input_filepaths,
+        Path(args.output_dir),
+        args.workers,
+        args.tolerance,
+        metrics,
+        cache,
+        args.optimize_order,
+        args.fixed_point,
+    )
+    print(
+        f"{summary['files']} archivos ({summary['failed']} con error), "
+        f"{summary['blocks']} bloques en {summary['seconds']:.2f} s: "
+        f"{summary['files_per_second']:.1f} archivos/s, "
+        f"{summary['blocks_per_second']:.0f} bloques/s, "
+        f"{summary['megabytes_per_second']:.1f} MB/s"
+    )
+    report_metrics(args, metrics)
+    return 1 if summary["failed"] else 0
+
+
+def run_watch(args, cache=None):
+    """Fixes the cam files dropped in the inbox until the daemon is stopped with Ctrl+C."""
+    # asyncio is only imported by the daemon, not by every run of the app.
+    import asyncio
+
+    from camfixer.watch_cam import MAX_QUEUE, POLL_INTERVAL, watch_cam
+
+    poll_interval = args.poll_interval if args.poll_interval is not None else POLL_INTERVAL
+    max_queue = args.queue_size if args.queue_size is not None else MAX_QUEUE
+    try:
+        asyncio.run(
+            watch_cam(
+                args.watch,
+                args.output_dir,
+                args.workers,
+                args.tolerance,
+                cache,
+                poll_interval,
+                max_queue,
+                decimals=args.fixed_point,
+                optimize_order=args.optimize_order,
+            )
+        )
+    except KeyboardInterrupt:
+        print("Modo watch detenido.")
+    return 0
+
+
+def run_serve(args, cache=None):
+    """Serves the fixer over HTTP until it is stopped with Ctrl+C."""
+    from camfixer.serve_cam import serve_cam
+
+    try:
+        serve_cam(
+            args.host,
+            args.serve,
+            args.workers,
+            args.tolerance,
+            cache,
+            decimals=args.fixed_point,
+            optimize_order=args.optimize_order,
+        )
+    except KeyboardInterrupt:
+        print("Servidor detenido.")
+    return 0
+
+
+def main(argv=None):
     """Runs the main function."""
-    OUTPUT_FILE = "output.cam"
-    # Verificar si se proporcionó un archivo .CAM como argumento
-    if len(sys.argv) != 2:
-        print("Uso: python app.py archivo.cam")
-        sys.exit(1)
+    args = parse_args(argv)
+    cache = ResultCache(Path(args.cache_dir), int(args.cache_size * 1024 * 1024))
+    if args.cache_info or args.clear_cache:
+        return run_cache(args, cache)
+    if args.no_cache:
+        cache = None
 
-    # Obtener el nombre del archivo .CAM proporcionado como argumento
-    input_filepath = Path(sys.argv[1])
-    print ("Archivo .CAM cargado correctamente.")
+    # The counters of optimize_cut_order are the report of --optimize-order.
+    metrics = StageMetrics(enabled=args.profile or args.metrics is not None or args.optimize_order)
+    if args.batch is not None:
+        return run_batch(args, metrics, cache)
+    if args.watch is not None:
+        return run_watch(args, cache)
+    if args.serve is not None:
+        return run_serve(args, cache)
+    if args.save_analysis or is_cam_analysis(args.input):
+        return run_analysis(args, metrics)
+    if args.check:
+        return run_check(args)
+    if args.incremental:
+        return run_incremental(args, metrics)
 
-    block_gen = block_generator(input_filepath)
+    from camfixer.fix_cam import fix_cam
 
-    blocks = list(block_gen)
+    # Obtener el nombre del archivo .CAM proporcionado como argumento
+    input_filepath = Path(args.input)
+    print ("Archivo .CAM cargado correctamente.")
 
     # es_pieza(blocks)
 
-
     # Save the blocks to a new file
-    save_cam(blocks, OUTPUT_FILE)
+    # numpy and shapely are only loaded if some block has to be fixed.
+    fix_cam(
+        input_filepath,
+        args.output,
+        args.tolerance,
+        metrics,
+        check=True,
+        cache=cache,
+        workers=args.workers,
+        optimize_order=args.optimize_order,
+        decimals=args.fixed_point,
+    )
+    report_metrics(args, metrics)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    raise SystemExit(main())
@@ -0,0 +1,224 @@
+"""This module generates synthetic cam programs, nests of parts with holes, for the benchmarks."""
+
+import math
+import random
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+# Size of the square cell of the sheet that holds each part, in mm.
+CELL_SIZE = 120.0
+# Distance between the pierce point and the start of the contour, in mm.
+LEAD_IN = 2.0
+
+
+def _format(value: float) -> str:
+    return f"{value:+.1f}"
+
+
+def _contour(
+    path: List[str],
+    start: Tuple[float, float],
+    normal: Tuple[float, float],
+    counterclockwise: bool,
+    lead_in: float,
+) -> List[str]:
+    """Build the lines of one block: pierce point, compensation, lead-in arc and main path.
+
+    Args:
+        path (List[str]): The motion lines of the main path, from start back to start.
+        start (Tuple[float, float]): The first point of the main path.
+        normal (Tuple[float, float]): The unit vector from start to the pierce point.
+        counterclockwise (bool): The direction of the main path.
+        lead_in (float): The distance from the pierce point to start.
+    Returns:
+        List[str]: The lines of the block, from "G00" to "G40".
+    """
+    x, y = start
+    pierce_x, pierce_y = x + lead_in * normal[0], y + lead_in * normal[1]
+    # The lead-in arc is a quarter circle around the pierce point that ends at start.
+    turn = -1 if counterclockwise else 1
+    arc_x = pierce_x - turn * (y - pierce_y)
+    arc_y = pierce_y + turn * (x - pierce_x)
+    arc_g = "G03" if counterclockwise else "G02"
+    return [
+        f"G00X{_format(pierce_x)}Y{_format(pierce_y)}",
+        "G41" if counterclockwise else "G42",
+        "M04",
+        f"G01X{_format(arc_x)}Y{_format(arc_y)}",
+        f"{arc_g}X{_format(x)}Y{_format(y)}I{_format(pierce_x)}J{_format(pierce_y)}",
+        *path,
+        "M03",
+        "G40",
+    ]
+
+
+def _rectangle(
+    x0: float, y0: float, x1: float, y1: float, radius: float, counterclockwise: bool
+) -> Tuple[List[str], Tuple[float, float]]:
+    """Build the main path of a rectangle that starts in the middle of its left side.
+
+    Args:
+        x0, y0, x1, y1 (float): The lower left and upper right corners.
+        radius (float): The radius of the rounded corners, 0 for sharp corners.
+        counterclockwise (bool): The direction of the path.
+    Returns:
+        Tuple[List[str], Tuple[float, float]]: The motion lines and the start point.
+    """
+    start = (x0, (y0 + y1) / 2)
+    # The corners in counterclockwise order from the start, with the directions in and out of them.
+    corners = [((x0, y0), (0, -1), (1, 0)), ((x1, y0), (1, 0), (0, 1)),
+               ((x1, y1), (0, 1), (-1, 0)), ((x0, y1), (-1, 0), (0, -1))]
+    if not counterclockwise:
+        corners = [(corner, (-d_out[0], -d_out[1]), (-d_in[0], -d_in[1]))
+                   for corner, d_in, d_out in reversed(corners)]
+    arc_g = "G03" if counterclockwise else "G02"
+
+    path = []
+    for (cx, cy), d_in, d_out in corners:
+        if radius > 0:
+            # Stops before the corner and rounds it with an arc.
+            entry = (cx - radius * d_in[0], cy - radius * d_in[1])
+            exit_ = (cx + radius * d_out[0], cy + radius * d_out[1])
+            center = (entry[0] + radius * d_out[0], entry[1] + radius * d_out[1])
+            path.append(f"G01X{_format(entry[0])}Y{_format(entry[1])}")
+            path.append(
+                f"{arc_g}X{_format(exit_[0])}Y{_format(exit_[1])}"
+                f"I{_format(center[0])}J{_format(center[1])}"
+            )
+        else:
+            path.append(f"G01X{_format(cx)}Y{_format(cy)}")
+    path.append(f"G01X{_format(start[0])}Y{_format(start[1])}")
+    return path, start
+
+
+def _circle(
+    cx: float, cy: float, radius: float, counterclockwise: bool
+) -> Tuple[List[str], Tuple[float, float]]:
+    """Build the main path of a circle, four quarter arcs that start at its leftmost point."""
+    start = (cx - radius, cy)
+    quarters = [(cx, cy - radius), (cx + radius, cy), (cx, cy + radius), start]
+    if not counterclockwise:
+        quarters = quarters[-2::-1] + [start]
+    arc_g = "G03" if counterclockwise else "G02"
+    path = [
+        f"{arc_g}X{_format(x)}Y{_format(y)}I{_format(cx)}J{_format(cy)}" for x, y in quarters
+    ]
+    return path, start
+
+
+def generate_nest(
+    n_contours: int = 1000,
+    holes_per_part: int = 4,
+    arc_density: float = 0.5,
+    nested_density: float = 0.1,
+    wrong_lead_ins: float = 0.5,
+    target_size: Optional[int] = None,
+    seed: int = 0,
+) -> Iterator[str]:
+    """This generator yields the lines of a synthetic cam program in the PEAK format.
+
+    The parts are rectangles laid on a grid of the sheet, each one with its holes in a
+    grid inside it. Holes are cut before their part and some holes have a small part
+    nested inside them, which is cut before the hole. Parts are added until the program
+    has at least n_contours contours or, if target_size is given, until its text reaches
+    that size.
+
+    Args:
+        n_contours (int): The minimum number of contours (blocks) of the program.
+        holes_per_part (int): The number of holes inside each part.
+        arc_density (float): The fraction of contours with arcs: parts with rounded
+            corners and round holes. The rest are sharp rectangles.
+        nested_density (float): The fraction of holes with a small part inside.
+        wrong_lead_ins (float): The fraction of contours with the lead-in on the wrong side,
+            the ones that the fixer has to move.
+        target_size (Optional[int]): The minimum size in bytes of the program, instead of n_contours.
+        seed (int): The seed of the random generator, the same seed gives the same program.
+    Yields:
+        str: Each line of the program, from "BOF" to "EOF".
+    """
+    rng = random.Random(seed)
+    contours_per_part = 1 + holes_per_part * (1 + nested_density)
+    n_parts = max(1, math.ceil((target_size or 0) / 250 / contours_per_part),
+                  math.ceil(n_contours / contours_per_part))
+    columns = math.ceil(math.sqrt(n_parts))
+    slots = math.ceil(math.sqrt(holes_per_part)) if holes_per_part else 0
+
+    def block(path, start, normal, counterclockwise, is_hole, lead_in=LEAD_IN):
+        # The lead-in goes outside parts and inside holes, unless it is a wrong one.
+        wrong = rng.random() < wrong_lead_ins
+        if is_hole != wrong:
+            normal = (-normal[0], -normal[1])
+        return _contour(path, start, normal, counterclockwise, lead_in)
+
+    yield "BOF"
+    yield "G90"
+    size = len("BOF\nG90\n")
+    contours = 0
+    part = 0
+    while contours < n_contours if target_size is None else size < target_size:
+        x0 = (part % columns) * CELL_SIZE
+        y0 = -(part // columns) * CELL_SIZE
+        width = rng.uniform(0.6, 0.9) * CELL_SIZE
+        height = rng.uniform(0.6, 0.9) * CELL_SIZE
+        lines = []
+
+        margin = 8.0
+        slot_w = (width - 2 * margin) / max(slots, 1)
+        slot_h = (height - 2 * margin) / max(slots, 1)
+        for hole in range(holes_per_part):
+            hx = x0 + margin + (hole % slots) * slot_w
+            hy = y0 + margin + (hole // slots) * slot_h
+            counterclockwise = rng.random() < 0.5
+            size_hole = min(slot_w, slot_h) - 4
+            center_x, center_y = hx + 2 + size_hole / 2, hy + 2 + size_hole / 2
+            is_round = rng.random() < arc_density
+            # The small nested part must fit inside the hole, also inside a round one.
+            half_inner = size_hole / 2 / (math.sqrt(2) if is_round else 1) - 3
+            if rng.random() < nested_density and half_inner > 2:
+                # A small part inside the hole, cut before it.
+                inner, start = _rectangle(center_x - half_inner, center_y - half_inner,
+                                          center_x + half_inner, center_y + half_inner,
+                                          0, counterclockwise)
+                lines += block(inner, start, (-1, 0), counterclockwise, False, 1.0)
+                contours += 1
+            if is_round:
+                path, start = _circle(center_x, center_y, size_hole / 2, counterclockwise)
+            else:
+                path, start = _rectangle(hx + 2, hy + 2, hx + 2 + size_hole, hy + 2 + size_hole,
+                                         0, counterclockwise)
+            lines += block(path, start, (-1, 0), counterclockwise, True, min(LEAD_IN, size_hole / 4))
+            contours += 1
+
+        counterclockwise = rng.random() < 0.5
+        radius = 5.0 if rng.random() < arc_density else 0.0
+        path, start = _rectangle(x0, y0, x0 + width, y0 + height, radius, counterclockwise)
+        lines += block(path, start, (-1, 0), counterclockwise, False)
+        contours += 1
+        part += 1
+
+        for line in lines:
+            size += len(line) + 1
+            yield line
+    yield "M02"
+    yield "EOF"
+
+
+def write_nest(cam_file, **parameters) -> int:
+    """Write a synthetic cam program generated by generate_nest.
+
+    Args:
+        cam_file (str): The path to the cam file.
+        **parameters: The parameters of generate_nest.
+    Returns:
+        int: The size of the file in bytes.
+    """
+    cam_file = Path(cam_file)
+    with open(cam_file, "w", encoding="utf-8") as file:
+        for line in generate_nest(**parameters):
+            file.write(line + "\n")
+    return cam_file.stat().st_size
+
+
+if __name__ == "__main__":
+    size = write_nest("nest.cam", n_contours=100)
+    print(f"nest.cam: {size} bytes")
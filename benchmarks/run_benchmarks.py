@@ -0,0 +1,117 @@
+"""This module times each stage of the fixer on synthetic nests of growing size.
+
+    python -m benchmarks.run_benchmarks --contours 10 1000 100000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.generate_nest import write_nest
+from camfixer.block_generator import _block_generator
+from camfixer.fix_lead_ins import fix_lead_ins
+from camfixer.get_hierarchy import set_hierarchy
+from camfixer.save_cam import save_cam
+
+# The stages of the fixer, in the order they run.
+STAGES = ("parse", "containment", "lead_ins", "write")
+
+
+def _time_stages(cam_file: Path, output_file: Path) -> Dict[str, float]:
+    """Run the fixer once on a cam file and time each stage, in seconds."""
+    times = {}
+    # The fixer prints every block it changes; the prints are timed but not shown.
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        blocks = list(_block_generator(cam_file))
+        times["parse"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        set_hierarchy(blocks)
+        times["containment"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        blocks = list(fix_lead_ins(blocks))
+        times["lead_ins"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        save_cam(blocks, output_file)
+        times["write"] = time.perf_counter() - start
+    return times
+
+
+def run_benchmarks(
+    contours: List[int],
+    repeat: int = 3,
+    holes_per_part: int = 4,
+    arc_density: float = 0.5,
+    seed: int = 0,
+) -> List[Dict[str, float]]:
+    """Time the stages of the fixer on a synthetic nest of each size.
+
+    Each nest is generated once and fixed `repeat` times; the best time of each stage
+    is kept, which is the least disturbed by the rest of the machine.
+
+    Args:
+        contours (List[int]): The number of contours of each nest.
+        repeat (int): The number of times each nest is fixed.
+        holes_per_part (int): The number of holes inside each part.
+        arc_density (float): The fraction of contours with arcs.
+        seed (int): The seed of the nest generator.
+    Returns:
+        List[Dict[str, float]]: For each nest, its number of contours, its size in
+        bytes and the time of each stage and of the whole run.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        cam_file = Path(directory) / "nest.cam"
+        output_file = Path(directory) / "output.cam"
+        for n_contours in contours:
+            size = write_nest(
+                cam_file,
+                n_contours=n_contours,
+                holes_per_part=holes_per_part,
+                arc_density=arc_density,
+                seed=seed,
+            )
+            runs = [_time_stages(cam_file, output_file) for _ in range(repeat)]
+            result = {"contours": n_contours, "bytes": size}
+            for stage in STAGES:
+                result[stage] = min(run[stage] for run in runs)
+            result["total"] = sum(result[stage] for stage in STAGES)
+            results.append(result)
+            os.remove(output_file)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mide cada etapa del corrector en nidos sinteticos.")
+    parser.add_argument(
+        "--contours",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000, 10000, 100000],
+        help="Cantidad de recorridos de cada nido (default: 10 a 100000).",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones de cada nido (default: 3).")
+    parser.add_argument("--holes", type=int, default=4, help="Agujeros por pieza (default: 4).")
+    parser.add_argument("--arc-density", type=float, default=0.5, help="Fraccion de recorridos con arcos.")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla del generador.")
+    args = parser.parse_args(argv)
+
+    print(f"{'recorridos':>10} {'MB':>8} " + " ".join(f"{stage:>11}" for stage in STAGES) + f" {'total':>9}")
+    for result in run_benchmarks(args.contours, args.repeat, args.holes, args.arc_density, args.seed):
+        print(
+            f"{result['contours']:>10} {result['bytes'] / 1e6:>8.2f} "
+            + " ".join(f"{result[stage]:>10.3f}s" for stage in STAGES)
+            + f" {result['total']:>8.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
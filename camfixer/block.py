@@ -0,0 +1,104 @@
+"""This module contains the record that holds the data of one block of a cam file."""
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from shapely.geometry import Point, Polygon
+
+Coordinate = Optional[Tuple[float, float]]
+
+
+def _point(xy: Coordinate) -> Point:
+    return Point(xy) if xy is not None else Point()
+
+
+@dataclass(slots=True, eq=False)
+class Block:
+    """The data of one block of a cam file.
+
+    The pierce point and the two points of the arc are stored as plain (x, y) tuples,
+    the Shapely points are only built when they are read. The main path, which is never
+    modified, is kept as one string instead of a list of lines. The text of the block is
+    not stored either, it is joined from its lines when it is read, so a block is always
+    written with its latest lines.
+
+    nuevo_ini is the pierce point computed for a lead-in on the wrong side, lead_in_fixed
+    is True only if the initial and arc lines were rewritten with it.
+
+    The fields can also be read and written with the keys of the old result dict,
+    e.g. block["is_piece"], while the callers migrate to attributes.
+    """
+
+    initial: List[str]
+    start: List[str]
+    arc: List[str]
+    main_text: str
+    end: List[str]
+    polygon: Polygon
+    num_block: int
+    orientacion: str
+    centro: Tuple[float, float]
+    ini_xy: Coordinate = None
+    arco1_xy: Coordinate = None
+    arco2_xy: Coordinate = None
+    is_arc_in: bool = False
+    is_piece: bool = False
+    is_circle: bool = False
+    contained_in: Optional[int] = None
+    depth: int = 0
+    nuevo_ini: object = None
+    lead_in_fixed: bool = False
+    collisions: Optional[List[int]] = None
+    _text: Optional[str] = None
+
+    @property
+    def ini_coordinates(self) -> Point:
+        """The point where the arc pierces the sheet."""
+        return _point(self.ini_xy)
+
+    @property
+    def arco1(self) -> Point:
+        return _point(self.arco1_xy)
+
+    @property
+    def arco2(self) -> Point:
+        """The end of the arc, which is the first point of the main path."""
+        return _point(self.arco2_xy)
+
+    @property
+    def main(self) -> List[str]:
+        """The lines of the main path."""
+        return self.main_text.split("\n") if self.main_text else []
+
+    @main.setter
+    def main(self, lines: List[str]):
+        self.main_text = "\n".join(lines)
+
+    @property
+    def text(self) -> str:
+        """The lines of the block joined with new lines."""
+        if self._text is not None:
+            return self._text
+        lines = self.initial + self.start + self.arc
+        if self.main_text:
+            lines = lines + [self.main_text]
+        return "\n".join(lines + self.end)
+
+    @text.setter
+    def text(self, value: str):
+        self._text = value
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value):
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return hasattr(self, key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
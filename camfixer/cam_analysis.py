@@ -0,0 +1,321 @@
+"""This module keeps a parsed and analysed cam program in a compact binary file, to use it without parsing the text again."""
+
+import json
+import mmap
+import os
+import tempfile
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+from shapely.geometry import Polygon
+
+from camfixer.block import Block
+from camfixer.cam_index import CamIndex
+from camfixer.cam_program import ARC_ROW, BATCH_BLOCKS, INITIAL_ROW, CamProgram
+from camfixer.get_hierarchy import get_hierarchy
+from camfixer.get_orientacion import get_orientacion_program
+from camfixer.is_arc_in import get_pierce_points, is_arc_in
+from camfixer.is_cam_analysis import ANALYSIS_SUFFIX, MAGIC
+from camfixer.stage_metrics import NO_METRICS
+from camfixer.tessellate_arcs import CHORD_TOLERANCE, get_is_circle, tessellate_arcs
+
+# The arrays start at multiples of this, so they can be used in place from the map.
+ALIGNMENT = 64
+
+# The orientation of a path stored as a number.
+ORIENTACIONES = {-1: "antihoraria", 0: "indeterminada", 1: "horaria"}
+
+
+@dataclass
+class CamAnalysis:
+    """A parsed cam program with the results of the analysis of every block, as arrays.
+
+    The program keeps the motions of every block, so its text can be written again, and
+    the polygon of block `b` is `polygon_points[polygon_offsets[b]:polygon_offsets[b + 1]]`.
+    The blocks that the program cannot write back as they were read keep their lines in
+    `verbatim_text[verbatim_offsets[b]:verbatim_offsets[b + 1]]`, empty for the others.
+
+    Attributes:
+        program (CamProgram): The motions of the blocks.
+        polygon_points (np.ndarray): The (m, 2) points of the polygons, with the arcs tessellated.
+        polygon_offsets (np.ndarray): The first point of each polygon, plus m.
+        orientacion (np.ndarray): 1 clockwise ("horaria"), -1 counterclockwise or 0 unknown.
+        area (np.ndarray): The signed area of each main path, positive if counterclockwise.
+        centro (np.ndarray): The (n, 2) average point of each main path.
+        parents (np.ndarray): The index of the direct container of each block, or -1.
+        depths (np.ndarray): The nesting depth of each block, odd depths are holes.
+        is_arc_in (np.ndarray): True if the pierce point is inside the contour.
+        is_circle (np.ndarray): True if the main path is a circle.
+        verbatim_text (np.ndarray): The UTF-8 bytes of the original segments, as JSON.
+        verbatim_offsets (np.ndarray): The first byte of the segment of each block, plus the total.
+        tolerance (float): The chord tolerance of the polygons.
+    """
+
+    program: CamProgram
+    polygon_points: np.ndarray
+    polygon_offsets: np.ndarray
+    orientacion: np.ndarray
+    area: np.ndarray
+    centro: np.ndarray
+    parents: np.ndarray
+    depths: np.ndarray
+    is_arc_in: np.ndarray
+    is_circle: np.ndarray
+    verbatim_text: np.ndarray
+    verbatim_offsets: np.ndarray
+    tolerance: float = CHORD_TOLERANCE
+
+    # The map of the file of load, which the arrays are views of; not a field, so it is not saved.
+    _map = None
+
+    @property
+    def n_blocks(self) -> int:
+        return self.program.n_blocks
+
+    @property
+    def is_piece(self) -> np.ndarray:
+        """True for the holes, the blocks at an odd depth."""
+        return self.depths % 2 == 1
+
+    @property
+    def to_fix(self) -> np.ndarray:
+        """True for the blocks whose lead-in is on the wrong side of the contour."""
+        return self.is_piece != self.is_arc_in
+
+    def summary(self) -> Dict[str, int]:
+        """Get the number of "blocks", "holes", "circles" and of blocks "to_fix"."""
+        return {
+            "blocks": self.n_blocks,
+            "holes": int(self.is_piece.sum()),
+            "circles": int(self.is_circle.sum()),
+            "to_fix": int(self.to_fix.sum()),
+        }
+
+    def close(self):
+        """Close the map of the file of load; the arrays of the analysis cannot be used after it.
+
+        Raises:
+            BufferError: If arrays of the analysis are still referenced outside of it.
+        """
+        if self._map is None:
+            return
+        # The map cannot be closed while the arrays are views of it.
+        for field in fields(self):
+            if field.name != "tolerance":
+                setattr(self, field.name, None)
+        data, self._map = self._map, None
+        data.close()
+
+    def __enter__(self) -> "CamAnalysis":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        arrays = {
+            f"program.{field.name}": getattr(self.program, field.name)
+            for field in fields(CamProgram)
+            if field.name != "decimals"
+        }
+        for field in fields(self):
+            if field.name not in ("program", "tolerance"):
+                arrays[field.name] = getattr(self, field.name)
+        return arrays
+
+    def save(self, analysis_file):
+        """Save the analysis to a binary file, written through a temporary file and renamed.
+
+        The file is MAGIC, the length of a JSON header and the header, with the tolerance,
+        the decimals of a fixed-point program and the name, dtype, shape and offset of each
+        array, followed by the raw arrays.
+
+        Args:
+            analysis_file (str): The path of the analysis file.
+        """
+        arrays = {name: np.ascontiguousarray(array) for name, array in self._arrays().items()}
+        header = {"tolerance": self.tolerance, "decimals": self.program.decimals, "arrays": {}}
+        offset = 0
+        for name, array in arrays.items():
+            header["arrays"][name] = {"dtype": array.dtype.str, "shape": array.shape, "offset": offset}
+            offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+        encoded = json.dumps(header).encode()
+        start = -(-(len(MAGIC) + 8 + len(encoded)) // ALIGNMENT) * ALIGNMENT
+
+        analysis_file = Path(analysis_file)
+        descriptor, temp_file = tempfile.mkstemp(
+            dir=analysis_file.parent, prefix=f".{analysis_file.name}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(MAGIC + len(encoded).to_bytes(8, "little") + encoded)
+                for name, array in arrays.items():
+                    file.seek(start + header["arrays"][name]["offset"])
+                    file.write(array.tobytes())
+                file.truncate(start + offset)
+            os.replace(temp_file, analysis_file)
+        except BaseException:
+            Path(temp_file).unlink(missing_ok=True)
+            raise
+
+    @classmethod
+    def load(cls, analysis_file) -> "CamAnalysis":
+        """Load an analysis file; the arrays are read-only views of a map of the file, not copies.
+        The map stays open until close is called, e.g. by using the analysis in a with block.
+
+        Args:
+            analysis_file (str): The path of the analysis file.
+        Returns:
+            CamAnalysis: The analysis saved in the file.
+        """
+        with open(analysis_file, "rb") as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if data[: len(MAGIC)] != MAGIC:
+            data.close()
+            raise ValueError(f"{analysis_file} no es un archivo de analisis")
+        length = int.from_bytes(data[len(MAGIC) : len(MAGIC) + 8], "little")
+        header = json.loads(data[len(MAGIC) + 8 : len(MAGIC) + 8 + length])
+        start = -(-(len(MAGIC) + 8 + length) // ALIGNMENT) * ALIGNMENT
+
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"], dtype=np.int64))
+            array = np.frombuffer(data, dtype=dtype, count=count, offset=start + spec["offset"])
+            arrays[name] = array.reshape(spec["shape"])
+        program_arrays = {
+            name[len("program.") :]: arrays.pop(name) for name in list(arrays) if name.startswith("program.")
+        }
+        # Older files have no flags of negative zeros, their blocks with one were kept verbatim.
+        n_rows = int(program_arrays["offsets"][-1])
+        program_arrays.setdefault("negative_zero", np.zeros((n_rows, 4), dtype=bool))
+        program = CamProgram(**program_arrays, decimals=header.get("decimals"))
+        analysis = cls(program=program, tolerance=header["tolerance"], **arrays)
+        analysis._map = data
+        return analysis
+
+    def blocks(self) -> Iterator[Block]:
+        """This generator builds the Block of each block from the arrays, with its nesting set.
+
+        The lines are formatted from the motions, like CamProgram.iter_text, so no text is
+        parsed, except for the blocks kept verbatim; the blocks are ready for fix_lead_ins.
+
+        Yields:
+            Block: The blocks, numbered from 1 in the order of the program.
+        """
+        program = self.program
+        parents = self.parents.tolist()
+        verbatim_offsets = self.verbatim_offsets.tolist()
+        for index in range(self.n_blocks):
+            start, end = verbatim_offsets[index], verbatim_offsets[index + 1]
+            if end > start:
+                segment = json.loads(self.verbatim_text[start:end].tobytes())
+            else:
+                segment = program.block_segment(index)
+            first_row = program.offsets[index]
+            points = self.polygon_points[self.polygon_offsets[index] : self.polygon_offsets[index + 1]]
+            depth = int(self.depths[index])
+            yield Block(
+                initial=segment["initial"],
+                start=segment["start"],
+                arc=segment["arc"],
+                main_text="\n".join(segment["main"]),
+                end=segment["end"],
+                polygon=Polygon(points) if len(points) >= 3 else Polygon(),
+                num_block=index + 1,
+                orientacion=ORIENTACIONES[int(self.orientacion[index])],
+                centro=tuple(self.centro[index].tolist()),
+                ini_xy=program.xy(first_row + INITIAL_ROW),
+                arco1_xy=program.xy(first_row + ARC_ROW),
+                arco2_xy=program.xy(first_row + ARC_ROW + 1),
+                is_arc_in=bool(self.is_arc_in[index]),
+                is_piece=depth % 2 == 1,
+                is_circle=bool(self.is_circle[index]),
+                contained_in=parents[index] + 1 if parents[index] >= 0 else None,
+                depth=depth,
+            )
+
+
+def _verbatim(program: CamProgram, segments: List[Dict[str, List[str]]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the segments of the blocks that CamProgram.block_segment does not give back the same.
+
+    Those are the blocks with lines that are not motions, e.g. a comment, with other words
+    than X, Y, I and J, e.g. "F500", or with coordinates written with other decimals.
+    """
+    encoded = [
+        b"" if program.block_segment(index) == segment else json.dumps(segment).encode()
+        for index, segment in enumerate(segments)
+    ]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(text) for text in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def analyze_cam(cam_file, tolerance=CHORD_TOLERANCE, metrics=NO_METRICS, decimals=None) -> CamAnalysis:
+    """Parse a cam file and analyse all its blocks, the same analysis as block_generator.
+
+    Args:
+        cam_file (str): The path to the cam file.
+        tolerance (float): The maximum distance between the arcs and the chords of the polygons.
+        metrics (StageMetrics): Records the time of the read, segment, parse, polygons and
+            containment stages.
+        decimals (Optional[int]): Keep the coordinates of the program in fixed point with
+            these decimals, so its blocks are written back exactly as they were read.
+    Returns:
+        CamAnalysis: The program and the analysis of its blocks.
+    """
+    with metrics.stage("read"):
+        index = CamIndex(cam_file)
+    with index:
+        with metrics.stage("segment"):
+            segments = list(index.iter_segments())
+    with metrics.stage("parse"):
+        # Parsed in batches like block_generator, to keep the tokens of one batch at a time.
+        program = CamProgram.concatenate(
+            [
+                CamProgram.from_segments(segments[start : start + BATCH_BLOCKS], decimals)
+                for start in range(0, len(segments), BATCH_BLOCKS)
+            ]
+        )
+        geometry = program.as_float()
+        orientaciones = get_orientacion_program(geometry)
+        circles = get_is_circle(program)
+        verbatim_text, verbatim_offsets = _verbatim(program, segments)
+    with metrics.stage("polygons"):
+        polygon_points, polygon_offsets = tessellate_arcs(geometry, tolerance)
+        arcs_in = is_arc_in(get_pierce_points(geometry), polygon_points, polygon_offsets)
+        polygons = [
+            Polygon(polygon_points[start:end]) if end - start >= 3 else Polygon()
+            for start, end in zip(polygon_offsets[:-1].tolist(), polygon_offsets[1:].tolist())
+        ]
+    with metrics.stage("containment"):
+        parents, depths = get_hierarchy(polygons)
+    metrics.count("blocks", program.n_blocks)
+
+    orientacion = np.zeros(program.n_blocks, dtype=np.int8)
+    orientacion[orientaciones["orientacion"] == "horaria"] = 1
+    orientacion[orientaciones["orientacion"] == "antihoraria"] = -1
+    return CamAnalysis(
+        program=program,
+        polygon_points=polygon_points,
+        polygon_offsets=polygon_offsets,
+        orientacion=orientacion,
+        area=orientaciones["area"],
+        centro=orientaciones["centro"],
+        parents=np.array([-1 if parent is None else parent for parent in parents], dtype=np.int64),
+        depths=depths,
+        is_arc_in=arcs_in,
+        is_circle=circles,
+        verbatim_text=verbatim_text,
+        verbatim_offsets=verbatim_offsets,
+        tolerance=tolerance,
+    )
+
+
+if __name__ == "__main__":
+    analysis = analyze_cam("archivo.cam")
+    analysis.save("archivo" + ANALYSIS_SUFFIX)
+    with CamAnalysis.load("archivo" + ANALYSIS_SUFFIX) as analysis:
+        print(analysis.summary())
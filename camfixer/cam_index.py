@@ -0,0 +1,160 @@
+"""This module indexes the blocks of a memory-mapped cam file by byte offset, to decode them on demand."""
+
+import io
+import mmap
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+from camfixer.segment_cam import segment_cam
+
+# Bytes scanned at once, it bounds the memory of the scan and not of the file.
+SCAN_CHUNK = 16 * 1024 * 1024
+
+# Kinds of the non-empty lines.
+OTHER = 0
+OPEN = 1
+CLOSE = 2
+END = 3
+_MARKERS = {OPEN: b"M04", CLOSE: b"M03", END: b"G40"}
+
+
+class CamIndex:
+    """The byte ranges of the blocks of a cam file, found on a memory map of the file.
+
+    Opening the index scans the bytes once with numpy, chunk by chunk, for the "M04",
+    "M03" and "G40" lines; nothing is decoded. The rules of segment_cam are applied to
+    the non-empty lines: a block opens at a "M04", its next two lines are the arc, and
+    the first "M03" followed by "G40" after them closes it, unless another "M04" comes
+    first. The range of a block goes from its initial line, the second non-empty line
+    before the "M04", to the end of the "G40", so decoding it and running segment_cam on
+    it gives the same block as segmenting the whole file.
+
+    Use it as a context manager, or call close, to release the map.
+
+    Attributes:
+        path (Path): The path to the cam file.
+        starts (np.ndarray): The byte offset of the first line of each block.
+        ends (np.ndarray): The byte offset after the "G40" of each block.
+    """
+
+    def __init__(self, cam_file):
+        self.path = Path(cam_file)
+        self._file = open(self.path, "rb")
+        if self.path.stat().st_size == 0:
+            # An empty file cannot be mapped.
+            self._map = b""
+            self.starts = self.ends = np.empty(0, dtype=np.int64)
+            return
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._scan()
+
+    def _scan(self):
+        data = np.frombuffer(self._map, dtype=np.uint8)
+        size = len(data)
+        opens, opens_start, closes, closes_end = [], [], [], []
+        # The last two non-empty lines of the previous chunk: starts, ends and kinds.
+        carry = (np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.int8))
+        ordinal = 0
+
+        begin = 0
+        while begin < size:
+            stop = min(begin + SCAN_CHUNK, size)
+            if stop < size:
+                # The chunk ends after a newline, so no line is split.
+                last = self._map.rfind(b"\n", begin, stop)
+                stop = last + 1 if last >= 0 else (self._map.find(b"\n", stop) + 1 or size)
+            newlines = np.flatnonzero(data[begin:stop] == 10) + begin
+            starts = np.concatenate(([begin], newlines + 1))
+            ends = np.concatenate((newlines, [stop]))
+            if starts[-1] == stop:
+                starts, ends = starts[:-1], ends[:-1]
+            # Drops the "\r" of the "\r\n" newlines, then the empty lines.
+            has_return = np.zeros(len(starts), dtype=bool)
+            has_text = ends > starts
+            has_return[has_text] = data[ends[has_text] - 1] == 13
+            ends = ends - has_return
+            non_empty = ends > starts
+            starts, ends = starts[non_empty], ends[non_empty]
+
+            kinds = np.full(len(starts), OTHER, dtype=np.int8)
+            short = np.flatnonzero(ends - starts == 3)
+            chars = [data[starts[short] + offset] for offset in range(3)]
+            for kind, marker in _MARKERS.items():
+                is_marker = (chars[0] == marker[0]) & (chars[1] == marker[1]) & (chars[2] == marker[2])
+                kinds[short[is_marker]] = kind
+
+            # The carried lines go first, so the lines before a "M04" and the "G40" after a
+            # "M03" are found across chunks; only the markers of this chunk are kept.
+            first = len(carry[0])
+            starts = np.concatenate((carry[0], starts))
+            ends = np.concatenate((carry[1], ends))
+            kinds = np.concatenate((carry[2], kinds))
+            ordinals = np.arange(len(kinds)) + (ordinal - first)
+
+            new_opens = np.flatnonzero(kinds[first:] == OPEN) + first
+            opens.append(ordinals[new_opens])
+            opens_start.append(starts[np.maximum(new_opens - 2, 0)])
+            pairs = np.flatnonzero((kinds[:-1] == CLOSE) & (kinds[1:] == END))
+            pairs = pairs[pairs + 1 >= first]
+            closes.append(ordinals[pairs])
+            closes_end.append(ends[pairs + 1])
+
+            ordinal += len(kinds) - first
+            carry = (starts[-2:], ends[-2:], kinds[-2:])
+            begin = stop
+
+        opens, opens_start = np.concatenate(opens), np.concatenate(opens_start)
+        closes, closes_end = np.concatenate(closes), np.concatenate(closes_end)
+        # The first "M03" after the two lines of the arc, if it comes before the next "M04".
+        close = np.searchsorted(closes, opens + 3)
+        following = np.append(opens[1:], np.iinfo(np.int64).max)
+        valid = close < len(closes)
+        valid[valid] = closes[close[valid]] < following[valid]
+        self.starts = opens_start[valid]
+        self.ends = closes_end[close[valid]]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def text(self, block: int) -> str:
+        """Decode the lines of a block, with the newlines of the file normalized to "\\n"."""
+        raw = self._map[int(self.starts[block]) : int(self.ends[block])]
+        if b"\r" in raw:
+            # Universal newlines, like the file opened in text mode.
+            return io.StringIO(raw.decode("utf-8"), newline=None).getvalue()
+        return raw.decode("utf-8")
+
+    def segment(self, block: int) -> Dict[str, List[str]]:
+        """Get the lines of a block, as segment_cam yields them.
+
+        Args:
+            block (int): The index of the block, from 0.
+        Returns:
+            Dict[str, List[str]]: The "initial", "start", "arc", "main" and "end" lines.
+        """
+        return next(segment_cam(self.text(block).split("\n")))
+
+    def iter_segments(self) -> Iterator[Dict[str, List[str]]]:
+        """This generator decodes the blocks one at a time, in the order of the file."""
+        for block in range(len(self)):
+            yield self.segment(block)
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "CamIndex":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == "__main__":
+    with CamIndex("archivo.cam") as index:
+        print(f"{len(index)} bloques")
+        if len(index):
+            print(index.text(len(index) - 1))
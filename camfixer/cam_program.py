@@ -0,0 +1,263 @@
+"""This module contains the columnar representation of the motions of a whole cam program."""
+
+from dataclasses import dataclass, replace
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from camfixer.fixed_point import MISSING, format_fixed, scale, to_float
+from camfixer.segment_cam import segment_cam
+from camfixer.tokenize_cam import tokenize_cam
+
+# Every block takes one row for the initial coordinate and two rows for the arc,
+# the main path starts after them.
+INITIAL_ROW = 0
+ARC_ROW = 1
+MAIN_ROW = 3
+
+# Number of closed blocks that are parsed together.
+BATCH_BLOCKS = 512
+
+
+@dataclass
+class CamProgram:
+    """The motions of a cam program stored as contiguous arrays, one row per motion line.
+
+    The rows of block `b` are `offsets[b]:offsets[b + 1]`: the initial coordinate, the two
+    lines of the arc and then the main path. Lines of a block without a motion keep their
+    row with `g == -1` and NaN coordinates, but their text is not stored.
+
+    In fixed point (`decimals` is not None) the coordinates are int64 units of
+    10**-decimals mm, MISSING instead of NaN, and they are written back digit by digit;
+    the geometry is computed on the floats of as_float.
+
+    Attributes:
+        g (np.ndarray): The motion code of each row (0 to 3), or -1.
+        x (np.ndarray): The X coordinate of each row.
+        y (np.ndarray): The Y coordinate of each row.
+        i (np.ndarray): The I coordinate (arc center) of each row, NaN if missing.
+        j (np.ndarray): The J coordinate (arc center) of each row, NaN if missing.
+        offsets (np.ndarray): The first row of each block, plus the total number of rows.
+        comp (np.ndarray): The radius compensation of each block: 41, 42 or 0 if unknown.
+        negative_zero (np.ndarray): The (n, 4) flags of the x, y, i and j of each row written
+            as "-0.0", so they are written back the same in fixed point.
+        decimals (Optional[int]): The decimals of the fixed-point coordinates, None for floats.
+    """
+
+    g: np.ndarray
+    x: np.ndarray
+    y: np.ndarray
+    i: np.ndarray
+    j: np.ndarray
+    offsets: np.ndarray
+    comp: np.ndarray
+    negative_zero: np.ndarray
+    decimals: Optional[int] = None
+
+    @classmethod
+    def from_segments(
+        cls, segments: Iterable[Dict[str, List[str]]], decimals: Optional[int] = None
+    ) -> "CamProgram":
+        """Build the program from the blocks yielded by segment_cam.
+
+        Args:
+            segments (Iterable[Dict[str, List[str]]]): The lines of each block.
+            decimals (Optional[int]): Parse the coordinates to fixed point with these decimals.
+        Returns:
+            CamProgram: The program with the parsed motions of all the blocks.
+        """
+        lines = []
+        offsets = [0]
+        comp = []
+        for segment in segments:
+            # Pads the missing lines so every block keeps the same row layout.
+            initial = (segment["initial"] + [""])[:1]
+            arc = (segment["arc"] + ["", ""])[:2]
+            lines.extend(initial + arc + segment["main"])
+            offsets.append(len(lines))
+            start = segment["start"][0] if segment["start"] else ""
+            comp.append(int(start[1:]) if start in ("G41", "G42") else 0)
+
+        tokens = tokenize_cam(lines, decimals)
+        return cls(
+            offsets=np.array(offsets, dtype=np.int64),
+            comp=np.array(comp, dtype=np.int8),
+            decimals=decimals,
+            **tokens,
+        )
+
+    @classmethod
+    def concatenate(cls, programs: List["CamProgram"]) -> "CamProgram":
+        """Join several programs, keeping the order of their blocks.
+
+        Args:
+            programs (List[CamProgram]): The programs to join.
+        Returns:
+            CamProgram: One program with all the blocks.
+        """
+        if not programs:
+            return cls.from_segments([])
+        offsets = [programs[0].offsets[:1]]
+        total = 0
+        for program in programs:
+            offsets.append(program.offsets[1:] + total)
+            total += program.n_rows
+        return cls(
+            g=np.concatenate([program.g for program in programs]),
+            x=np.concatenate([program.x for program in programs]),
+            y=np.concatenate([program.y for program in programs]),
+            i=np.concatenate([program.i for program in programs]),
+            j=np.concatenate([program.j for program in programs]),
+            offsets=np.concatenate(offsets),
+            comp=np.concatenate([program.comp for program in programs]),
+            negative_zero=np.concatenate([program.negative_zero for program in programs]),
+            decimals=programs[0].decimals,
+        )
+
+    @property
+    def n_blocks(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def n_rows(self) -> int:
+        return int(self.offsets[-1])
+
+    def as_float(self) -> "CamProgram":
+        """Get the program with the coordinates in mm as floats, itself if they already are."""
+        if self.decimals is None:
+            return self
+        columns = [to_float(getattr(self, name), self.decimals) for name in "xyij"]
+        if self.negative_zero.any():
+            # The floats keep the sign of the zeros, like the floats parsed from the text.
+            columns = [
+                np.where(self.negative_zero[:, index], -0.0, column) for index, column in enumerate(columns)
+            ]
+        return replace(self, **dict(zip("xyij", columns)), decimals=None)
+
+    def xy(self, row: int) -> Optional[Tuple[float, float]]:
+        """Get the (x, y) point of a row in mm, or None if the row has no motion."""
+        if self.g[row] < 0:
+            return None
+        if self.decimals is None:
+            return (float(self.x[row]), float(self.y[row]))
+        units = scale(self.decimals)
+        return (int(self.x[row]) / units, int(self.y[row]) / units)
+
+    @property
+    def main_offsets(self) -> np.ndarray:
+        """The first row of the main path of each block, plus the total number of rows."""
+        starts = self.offsets.copy()
+        starts[:-1] += MAIN_ROW
+        return starts
+
+    def main_coordinates(self, block: int) -> np.ndarray:
+        """Get the (x, y) coordinates of the main path of a block, as an (n, 2) array.
+
+        Args:
+            block (int): The index of the block.
+        Returns:
+            np.ndarray: The coordinates of the motion rows of the main path.
+        """
+        rows = slice(self.offsets[block] + MAIN_ROW, self.offsets[block + 1])
+        is_motion = self.g[rows] >= 0
+        return np.column_stack((self.x[rows][is_motion], self.y[rows][is_motion]))
+
+    def block_segment(self, block: int) -> Dict[str, List[str]]:
+        """Format the lines of a block back to cam text, split like segment_cam does.
+
+        Args:
+            block (int): The index of the block.
+        Returns:
+            Dict[str, List[str]]: The "initial", "start", "arc", "main" and "end" lines;
+            rows without a motion are left out.
+        """
+        lines = [
+            self._format_row(row) if self.g[row] >= 0 else ""
+            for row in range(self.offsets[block], self.offsets[block + 1])
+        ]
+        start = [f"G{self.comp[block]}"] if self.comp[block] else []
+        return {
+            "initial": list(filter(None, lines[:ARC_ROW])),
+            "start": start + ["M04"],
+            "arc": list(filter(None, lines[ARC_ROW:MAIN_ROW])),
+            "main": list(filter(None, lines[MAIN_ROW:])),
+            "end": ["M03", "G40"],
+        }
+
+    def block_lines(self, block: int) -> List[str]:
+        """Format the lines of a block back to cam text, with one decimal or the fixed-point decimals.
+
+        Args:
+            block (int): The index of the block.
+        Returns:
+            List[str]: The lines of the block, from the initial coordinate to "G40".
+        """
+        segment = self.block_segment(block)
+        return segment["initial"] + segment["start"] + segment["arc"] + segment["main"] + segment["end"]
+
+    def iter_text(self) -> Iterator[str]:
+        """This generator yields the text of each block, in order.
+
+        Yields:
+            str: The lines of a block joined with new lines.
+        """
+        for block in range(self.n_blocks):
+            yield "\n".join(self.block_lines(block))
+
+    def _format_row(self, row: int) -> str:
+        if self.decimals is not None:
+            return self._format_fixed_row(row)
+        line = f"G0{self.g[row]}X{self.x[row]:+.1f}Y{self.y[row]:+.1f}"
+        if not np.isnan(self.i[row]):
+            line += f"I{self.i[row]:+.1f}"
+        if not np.isnan(self.j[row]):
+            line += f"J{self.j[row]:+.1f}"
+        return line
+
+    def _format_fixed_row(self, row: int) -> str:
+        x, y, i, j = (int(self.x[row]), int(self.y[row]), int(self.i[row]), int(self.j[row]))
+        nx, ny, ni, nj = self.negative_zero[row].tolist()
+        line = f"G0{self.g[row]}X{format_fixed(x, self.decimals, nx)}Y{format_fixed(y, self.decimals, ny)}"
+        if i != MISSING:
+            line += f"I{format_fixed(i, self.decimals, ni)}"
+        if j != MISSING:
+            line += f"J{format_fixed(j, self.decimals, nj)}"
+        return line
+
+
+def iter_cam_programs(file: Iterable[str], decimals: Optional[int] = None) -> Iterator[CamProgram]:
+    """This generator parses a cam file in batches of BATCH_BLOCKS blocks.
+
+    Args:
+        file (Iterable[str]): The lines of the cam file, e.g. an open file handle.
+        decimals (Optional[int]): Parse the coordinates to fixed point with these decimals.
+    Yields:
+        CamProgram: The program of each batch of blocks.
+    """
+    segments = segment_cam(file)
+    while True:
+        batch = list(islice(segments, BATCH_BLOCKS))
+        if not batch:
+            break
+        yield CamProgram.from_segments(batch, decimals)
+
+
+def read_cam_program(cam_file: str, decimals: Optional[int] = None) -> CamProgram:
+    """Parse a whole cam file into a CamProgram, one batch of blocks at a time.
+
+    Args:
+        cam_file (str): The path to the cam file.
+        decimals (Optional[int]): Parse the coordinates to fixed point with these decimals.
+    Returns:
+        CamProgram: The program with all the blocks of the file.
+    """
+    with open(cam_file, "r", encoding="utf-8") as file:
+        return CamProgram.concatenate(list(iter_cam_programs(file, decimals)))
+
+
+if __name__ == "__main__":
+    program = read_cam_program("archivo.cam")
+    print(f"{program.n_blocks} bloques, {program.n_rows} movimientos")
+    for text in program.iter_text():
+        print(text)
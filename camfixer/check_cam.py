@@ -0,0 +1,97 @@
+"""This module finds the blocks of a cam file whose lead-in is on the wrong side, without numpy or shapely."""
+
+from collections import defaultdict
+from statistics import median
+from typing import List, Optional, Tuple
+
+from camfixer.segment_cam import MOTION_PATTERN, segment_cam
+from camfixer.tessellate_path import CHORD_TOLERANCE, tessellate_path
+
+
+def _last_point(lines: List[str]) -> Optional[Tuple[float, float]]:
+    point = None
+    for line in lines:
+        match = MOTION_PATTERN.search(line)
+        if match:
+            point = (float(match.group(2)), float(match.group(3)))
+    return point
+
+
+def _point_in_polygon(x: float, y: float, polygon: List[Tuple[float, float]]) -> bool:
+    """Even-odd rule: count the edges that a ray from the point to the right crosses."""
+    inside = False
+    x1, y1 = polygon[-1]
+    for x2, y2 in polygon:
+        if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+            inside = not inside
+        x1, y1 = x2, y2
+    return inside
+
+
+def check_cam(cam_file, tolerance=CHORD_TOLERANCE) -> Tuple[int, List[Tuple[int, bool]]]:
+    """Find the blocks that block_generator would modify, with plain Python geometry.
+
+    Each block is tessellated like in the fixer. A block is inside another one if its
+    bounding box is inside the other's and its first point is inside the other polygon;
+    the depth of a block is the number of blocks that contain it, odd depths are holes.
+    Holes need their lead-in inside them and outer contours outside them.
+
+    Args:
+        cam_file (str): The path to the cam file.
+        tolerance (float): The maximum distance between the arcs and the chords of the polygons.
+    Returns:
+        Tuple[int, List[Tuple[int, bool]]]: The number of blocks of the file and, for each
+        block with the lead-in on the wrong side, its num_block and whether it is a hole.
+    """
+    polygons = []
+    boxes = []
+    pierces = []
+    with open(cam_file, "r", encoding="utf-8") as file:
+        for segment in segment_cam(file):
+            start = _last_point(segment["initial"] + segment["arc"])
+            polygon = tessellate_path(segment["main"], start, tolerance)
+            xs = [x for x, _ in polygon] or [0.0]
+            ys = [y for _, y in polygon] or [0.0]
+            polygons.append(polygon)
+            boxes.append((min(xs), max(xs), min(ys), max(ys)))
+            pierces.append(_last_point(segment["initial"]))
+
+    # A grid of the sheet, each cell lists the blocks whose bounding box touches it.
+    cell = median(max(box[1] - box[0], box[3] - box[2]) for box in boxes) if boxes else 1.0
+    cell = cell or 1.0
+    grid = defaultdict(list)
+    for index, (min_x, max_x, min_y, max_y) in enumerate(boxes):
+        for column in range(int(min_x // cell), int(max_x // cell) + 1):
+            for row in range(int(min_y // cell), int(max_y // cell) + 1):
+                grid[column, row].append(index)
+
+    to_fix = []
+    for index, polygon in enumerate(polygons):
+        if len(polygon) < 3:
+            continue
+        min_x, max_x, min_y, max_y = boxes[index]
+        x, y = polygon[0]
+        depth = 0
+        for other in grid[int(x // cell), int(y // cell)]:
+            box = boxes[other]
+            if (
+                other != index
+                and box[0] <= min_x
+                and box[1] >= max_x
+                and box[2] <= min_y
+                and box[3] >= max_y
+                and _point_in_polygon(x, y, polygons[other])
+            ):
+                depth += 1
+        is_piece = depth % 2 == 1
+        pierce = pierces[index]
+        is_arc_in = pierce is not None and _point_in_polygon(*pierce, polygon)
+        if is_piece != is_arc_in:
+            to_fix.append((index + 1, is_piece))
+
+    return len(polygons), to_fix
+
+
+if __name__ == "__main__":
+    n_blocks, to_fix = check_cam("archivo.cam")
+    print(f"{n_blocks} bloques, {len(to_fix)} a corregir")
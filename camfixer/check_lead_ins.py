@@ -0,0 +1,191 @@
+"""This module checks that the corrected lead-ins do not cross the contours of other blocks."""
+
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import shapely
+
+from camfixer.block import Block
+from camfixer.check_cam import _last_point
+from camfixer.fixed_point import format_coordinate
+from camfixer.segment_cam import MOTION_PATTERN
+from camfixer.stage_metrics import NO_METRICS
+from camfixer.tessellate_path import CHORD_TOLERANCE, tessellate_path
+
+# Number of fixed blocks whose lead-ins are tested together.
+CHECK_CHUNK = 512
+# Each retry shortens a colliding lead-in to this fraction of its size.
+SHORTEN_FACTOR = 0.5
+# Number of times a colliding lead-in is shortened before it is flagged.
+LEAD_IN_RETRIES = 2
+
+
+def _lead_in_points(block: Block, tolerance: float) -> List[Tuple[float, float]]:
+    """The points of the lead-in as it is written: from the pierce point along the arc lines."""
+    pierce = _last_point(block.initial)
+    if pierce is None:
+        return []
+    return [pierce] + tessellate_path(block.arc, pierce, tolerance)
+
+
+def _format(
+    g: str, x: float, y: float, i: Optional[float], j: Optional[float], decimals: Optional[int]
+) -> str:
+    line = f"G0{g}X{format_coordinate(x, decimals)}Y{format_coordinate(y, decimals)}"
+    if i is not None:
+        line += f"I{format_coordinate(i, decimals)}"
+    if j is not None:
+        line += f"J{format_coordinate(j, decimals)}"
+    return line
+
+
+def shorten_lead_in(block: Block, factor: float = SHORTEN_FACTOR, decimals: Optional[int] = None) -> bool:
+    """Scale the lead-in of a block towards the point where it meets the contour.
+
+    The pierce point, the line and the center of the arc are scaled around the end of
+    the arc, the first point of the main path, so the lead-in keeps its shape and its
+    side of the contour and still ends on it.
+
+    Args:
+        block (Block): The block, its initial and arc lines are rewritten.
+        factor (float): The new size of the lead-in, as a fraction of the current one.
+        decimals (Optional[int]): The decimals of the fixed-point mode, see fix_lead_ins.
+    Returns:
+        bool: False if the block has no end point for its arc and was not changed.
+    """
+    if block.arco2_xy is None:
+        return False
+    x0, y0 = block.arco2_xy
+
+    def scale(lines: List[str]) -> List[str]:
+        scaled = []
+        for line in lines:
+            match = MOTION_PATTERN.fullmatch(line)
+            if not match:
+                scaled.append(line)
+                continue
+            g, x, y, i, j = match.groups()
+            scaled.append(
+                _format(
+                    g,
+                    x0 + (float(x) - x0) * factor,
+                    y0 + (float(y) - y0) * factor,
+                    x0 + (float(i) - x0) * factor if i is not None else None,
+                    y0 + (float(j) - y0) * factor if j is not None else None,
+                    decimals,
+                )
+            )
+        return scaled
+
+    block.initial = scale(block.initial)
+    block.arc = scale(block.arc)
+    return True
+
+
+def _collisions(
+    blocks: List[Block], tree, contours: List[Block], own: Dict[int, int], tolerance: float
+) -> List[List[int]]:
+    """For each block, the num_block of the other contours that its lead-in crosses."""
+    found = [[] for _ in blocks]
+    points = [_lead_in_points(block, tolerance) for block in blocks]
+    tested = np.array([index for index, path in enumerate(points) if len(path) >= 2], dtype=np.int64)
+    if not len(tested):
+        return found
+    # All the lead-ins of the chunk are built and queried at once.
+    sizes = np.array([len(points[index]) for index in tested.tolist()])
+    lines = shapely.linestrings(
+        [point for index in tested.tolist() for point in points[index]],
+        indices=np.repeat(np.arange(len(tested)), sizes),
+    )
+    lead_in_ids, contour_ids = tree.query(lines, predicate="intersects")
+    # The lead-in always ends on its own contour.
+    own_ids = np.array([own[id(blocks[index])] for index in tested.tolist()], dtype=np.int64)
+    others = contour_ids != own_ids[lead_in_ids]
+    lead_in_ids, contour_ids = lead_in_ids[others], contour_ids[others]
+    if not len(lead_in_ids):
+        return found
+    # A contour that only touches the end of the lead-in touches its own contour there,
+    # that is not the lead-in crossing it and shortening it would not help. The ends of a
+    # line are its boundary, so it touches the contour if they are the only points in common.
+    paired = lines[lead_in_ids]
+    rings = tree.geometries[contour_ids]
+    crossing = ~shapely.touches(paired, rings) | shapely.intersects(shapely.get_point(paired, 0), rings)
+    for lead_in_id, contour_id in zip(lead_in_ids[crossing].tolist(), contour_ids[crossing].tolist()):
+        found[int(tested[lead_in_id])].append(contours[contour_id].num_block)
+    return found
+
+
+def check_lead_ins(
+    fixed_blocks: Iterable[Block],
+    contours: List[Block],
+    tolerance: float = CHORD_TOLERANCE,
+    retries: int = LEAD_IN_RETRIES,
+    metrics=NO_METRICS,
+    decimals: Optional[int] = None,
+) -> Iterator[Block]:
+    """Esta funcion revisa que los arcos de entrada corregidos no choquen con otros recorridos.
+
+    The contours of all the blocks are indexed once in an STRtree. The fixed blocks are
+    then taken in chunks of CHECK_CHUNK, and the lead-ins that fix_lead_ins rewrote, read from
+    their lines as they will be cut, are queried together against the contours near them.
+    A lead-in that touches another contour is shortened with shorten_lead_in and tested
+    again, up to `retries` times; if it still collides its lead-in is put back as it was
+    fixed and the block is flagged in its collisions field and reported, to be checked by
+    hand. Touching another contour only at the end of the lead-in is not a collision.
+
+    Args:
+        fixed_blocks (Iterable[Block]): The blocks yielded by fix_lead_ins, in file order.
+        contours (List[Block]): All the blocks of the program, for the index.
+        tolerance (float): The maximum distance between the arcs and the chords of the polygons.
+        retries (int): The times a colliding lead-in is shortened before it is flagged.
+        metrics (StageMetrics): Counts the lead-ins shortened and the collisions left.
+        decimals (Optional[int]): The decimals of the fixed-point mode, see fix_lead_ins.
+    Yields:
+        Block: Each block, with its lead-in shortened or flagged if it collided.
+    """
+    tree = shapely.STRtree([block.polygon.exterior for block in contours])
+    own = {id(block): index for index, block in enumerate(contours)}
+    fixed_blocks = iter(fixed_blocks)
+    while True:
+        chunk = list(islice(fixed_blocks, CHECK_CHUNK))
+        if not chunk:
+            break
+        # Only the lead-ins whose lines were rewritten are tested, the others are cut as they came.
+        pending = [block for block in chunk if block.lead_in_fixed]
+        # The lines of each lead-in as fixed, put back if shortening does not help.
+        original = {id(block): (block.initial, block.arc) for block in pending}
+        for attempt in range(retries + 1):
+            if not pending:
+                break
+            colliding = []
+            for block, others in zip(pending, _collisions(pending, tree, contours, own, tolerance)):
+                if not others:
+                    continue
+                if attempt < retries and shorten_lead_in(block, decimals=decimals):
+                    metrics.count("lead_ins_shortened")
+                    colliding.append(block)
+                else:
+                    block.initial, block.arc = original[id(block)]
+                    block.collisions = others
+            pending = colliding
+
+        for block in chunk:
+            if block.collisions:
+                metrics.count("lead_in_collisions")
+                print(
+                    f"\nEl arco de entrada del bloque {block.num_block} choca con los bloques "
+                    f"{block.collisions}, se tiene que revisar a mano."
+                )
+            yield block
+
+
+if __name__ == "__main__":
+    from camfixer.block_generator import _block_generator
+    from camfixer.fix_lead_ins import fix_lead_ins
+    from camfixer.get_hierarchy import set_hierarchy
+
+    blocks = list(_block_generator("archivo.cam"))
+    set_hierarchy(blocks)
+    flagged = [block.num_block for block in check_lead_ins(fix_lead_ins(blocks), blocks) if block.collisions]
+    print(f"Bloques con choques: {flagged}")
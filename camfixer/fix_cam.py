@@ -0,0 +1,152 @@
+"""This module runs the whole fixer on one cam file: read, fix the blocks and save."""
+
+from pathlib import Path
+
+from camfixer.check_cam import check_cam
+from camfixer.save_cam import save_cam
+from camfixer.segment_cam import segment_cam
+from camfixer.stage_metrics import NO_METRICS
+from camfixer.tessellate_path import CHORD_TOLERANCE
+
+
+def fix_cam(
+    input_filepath,
+    output_filepath,
+    tolerance=CHORD_TOLERANCE,
+    metrics=NO_METRICS,
+    check=False,
+    cache=None,
+    workers=None,
+    optimize_order=False,
+    decimals=None,
+) -> int:
+    """Fix the blocks of a cam file and save them to a new cam file.
+    numpy and shapely are only imported when the blocks are fixed, so with check=True a
+    file that needs no change is copied block by block without loading them.
+    Args:
+        input_filepath (str): The path to the cam file to fix.
+        output_filepath (str): The path where the fixed cam file is saved.
+        tolerance (float): The maximum distance between the arcs and the chords of the polygons.
+        metrics (StageMetrics): Records the time of each stage, stopped when the file is saved.
+        check (bool): Run check_cam first and skip the fixer if no lead-in is on the wrong side.
+        cache (Optional[ResultCache]): If given, a file fixed before with the same
+            configuration is copied from the cache, and a new result is stored in it.
+        workers (int): The processes that fix the lead-ins, by default one per CPU.
+        optimize_order (bool): Reorder the blocks to shorten the rapid moves between them,
+            see optimize_cut_order; the fixer always runs, even if no lead-in is wrong.
+        decimals (Optional[int]): Read the coordinates to fixed point with these decimals
+            and round the new coordinates to them, see fixed_point; None uses floats.
+    Returns:
+        int: The number of blocks of the cam file.
+    """
+    metrics.count("bytes_read", Path(input_filepath).stat().st_size)
+    if cache is not None:
+        with metrics.stage("cache"):
+            key = cache.key(input_filepath, tolerance, optimize_order, decimals)
+            num_blocks = cache.get(key, output_filepath)
+        if num_blocks is not None:
+            metrics.count("cache_hits")
+            metrics.count("blocks", num_blocks)
+            metrics.stop()
+            return num_blocks
+        metrics.count("cache_misses")
+
+    num_blocks = _fix_cam(
+        input_filepath, output_filepath, tolerance, metrics, check, workers, optimize_order, decimals
+    )
+
+    if cache is not None:
+        with metrics.stage("cache"):
+            cache.put(key, output_filepath, num_blocks)
+    metrics.stop()
+    return num_blocks
+
+
+def _fix_cam(
+    input_filepath, output_filepath, tolerance, metrics, check, workers, optimize_order, decimals
+) -> int:
+    """Runs the fixer itself, see fix_cam."""
+    # The blocks are only copied as they are if their order is kept too.
+    if check and not optimize_order:
+        with metrics.stage("check"):
+            _, to_fix = check_cam(input_filepath, tolerance)
+        if not to_fix:
+            with open(input_filepath, "r", encoding="utf-8") as file:
+                # The blocks are written as they were read, like block_generator would.
+                blocks = (
+                    {
+                        "text": "\n".join(
+                            segment["initial"]
+                            + segment["start"]
+                            + segment["arc"]
+                            + segment["main"]
+                            + segment["end"]
+                        )
+                    }
+                    for segment in segment_cam(file)
+                )
+                num_blocks = save_cam(blocks, output_filepath, atomic=True, metrics=metrics)
+            metrics.count("blocks", num_blocks)
+            return num_blocks
+
+    from camfixer.block_generator import block_generator
+
+    # Each fixed block is written as soon as block_generator yields it.
+    num_blocks = save_cam(
+        block_generator(input_filepath, tolerance, metrics, workers, optimize_order, decimals),
+        output_filepath,
+        atomic=True,
+        metrics=metrics,
+    )
+    return num_blocks
+
+
+def fix_cam_analysis(
+    analysis_file, output_filepath, metrics=NO_METRICS, workers=None, optimize_order=False
+) -> int:
+    """Fix the blocks of an analysis file saved by CamAnalysis and save them to a cam file.
+    The text is not parsed again: the blocks are built from the arrays of the analysis,
+    with their nesting already known, so only the lead-ins are fixed. An analysis saved
+    in fixed point is fixed in fixed point too.
+    Args:
+        analysis_file (str): The path to the analysis file.
+        output_filepath (str): The path where the fixed cam file is saved.
+        metrics (StageMetrics): Records the time of each stage, stopped when the file is saved.
+        workers (int): The processes that fix the lead-ins, by default one per CPU.
+        optimize_order (bool): Reorder the blocks to shorten the rapid moves between them.
+    Returns:
+        int: The number of blocks of the program.
+    """
+    from camfixer.cam_analysis import CamAnalysis
+    from camfixer.check_lead_ins import check_lead_ins
+    from camfixer.fix_lead_ins_parallel import fix_lead_ins_parallel
+    from camfixer.optimize_cut_order import optimize_cut_order
+
+    with metrics.stage("read"):
+        analysis = CamAnalysis.load(analysis_file)
+        metrics.count("bytes_read", Path(analysis_file).stat().st_size)
+    # The blocks do not keep views of the map, it is closed once they are built.
+    with analysis:
+        with metrics.stage("parse"):
+            blocks = list(analysis.blocks())
+        decimals, tolerance = analysis.program.decimals, analysis.tolerance
+    metrics.count("blocks", len(blocks))
+
+    def counted(blocks):
+        for block in blocks:
+            if block.lead_in_fixed:
+                metrics.count("blocks_modified")
+            yield block
+
+    lead_ins = metrics.timed("lead_ins", fix_lead_ins_parallel(blocks, workers, decimals=decimals))
+    checked = metrics.timed(
+        "collisions",
+        check_lead_ins(lead_ins, blocks, tolerance, metrics=metrics, decimals=decimals),
+    )
+    if optimize_order:
+        checked = list(checked)
+        with metrics.stage("cut_order"):
+            checked = optimize_cut_order(checked, metrics=metrics)
+    num_blocks = save_cam(counted(checked), output_filepath, atomic=True, metrics=metrics)
+    metrics.stop()
+    return num_blocks
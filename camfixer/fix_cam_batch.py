@@ -0,0 +1,126 @@
+"""This module fixes many cam files at once, spreading them across a pool of worker processes."""
+
+import glob
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from camfixer.result_cache import ResultCache
+from camfixer.stage_metrics import NO_METRICS, StageMetrics
+from camfixer.tessellate_path import CHORD_TOLERANCE
+
+
+def find_cam_files(pattern: str) -> List[Path]:
+    """Get the cam files of a directory, or the files that match a glob pattern.
+    Args:
+        pattern (str): A directory, or a glob pattern such as "nests/*.cam".
+    Returns:
+        List[Path]: The sorted paths of the cam files.
+    """
+    path = Path(pattern)
+    if path.is_dir():
+        return sorted(child for child in path.iterdir() if child.suffix.lower() == ".cam")
+    return sorted(Path(match) for match in glob.glob(pattern) if Path(match).is_file())
+
+
+def _init_worker():
+    """Imports numpy, shapely and the fixer once, when the worker process starts."""
+    import camfixer.block_generator  # noqa: F401
+    import camfixer.fix_cam  # noqa: F401
+
+
+def _fix_one(
+    input_filepath: Path,
+    output_filepath: Path,
+    tolerance: float,
+    profile: bool,
+    cache: Optional[ResultCache],
+    optimize_order: bool = False,
+    decimals: Optional[int] = None,
+) -> Tuple[int, Optional[Dict]]:
+    """Runs in a worker; the import is already done by _init_worker, not in the parent.
+    The metrics of the file are sent back as a dict, to be merged by the parent.
+    The pool already runs one file per CPU, so the lead-ins of a file are fixed serially."""
+    from camfixer.fix_cam import fix_cam
+
+    metrics = StageMetrics(enabled=profile)
+    num_blocks = fix_cam(
+        input_filepath,
+        output_filepath,
+        tolerance,
+        metrics,
+        cache=cache,
+        workers=1,
+        optimize_order=optimize_order,
+        decimals=decimals,
+    )
+    return num_blocks, metrics.to_dict() if profile else None
+
+
+def fix_cam_batch(
+    input_filepaths: List[Path],
+    output_dir: Path,
+    workers: int = None,
+    tolerance: float = CHORD_TOLERANCE,
+    metrics: StageMetrics = NO_METRICS,
+    cache: Optional[ResultCache] = None,
+    optimize_order: bool = False,
+    decimals: Optional[int] = None,
+) -> Dict[str, float]:
+    """Fix every cam file in a pool of long-lived worker processes, one output per input.
+    The fixed files keep the name of their input and are saved in the output directory.
+    A file that fails is reported and does not stop the others.
+    Args:
+        input_filepaths (List[Path]): The cam files to fix.
+        output_dir (Path): The directory where the fixed files are saved.
+        workers (int): The number of worker processes, by default one per CPU.
+        tolerance (float): The maximum distance between the arcs and the chords of the polygons.
+        metrics (StageMetrics): Gets the sum of the stage times and counters of every file.
+        cache (Optional[ResultCache]): The cache of fixed files shared by the workers.
+        optimize_order (bool): Reorder the blocks of every file to shorten the rapid moves.
+        decimals (Optional[int]): The decimals of the fixed-point mode, None for floats.
+    Returns:
+        Dict[str, float]: The summary of the batch: "files", "failed", "blocks", "bytes",
+        "seconds", "files_per_second", "blocks_per_second" and "megabytes_per_second".
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    summary = {"files": 0, "failed": 0, "blocks": 0, "bytes": 0}
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {
+            pool.submit(
+                _fix_one,
+                path,
+                output_dir / path.name,
+                tolerance,
+                metrics.enabled,
+                cache,
+                optimize_order,
+                decimals,
+            ): path
+            for path in input_filepaths
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                num_blocks, file_metrics = future.result()
+            except Exception as error:
+                summary["failed"] += 1
+                print(f"Error al procesar {path}: {error}")
+                continue
+            summary["blocks"] += num_blocks
+            if file_metrics is not None:
+                metrics.merge(file_metrics)
+            summary["files"] += 1
+            summary["bytes"] += path.stat().st_size
+    seconds = time.perf_counter() - start
+    metrics.stop()
+
+    summary["seconds"] = seconds
+    summary["files_per_second"] = summary["files"] / seconds if seconds else 0.0
+    summary["blocks_per_second"] = summary["blocks"] / seconds if seconds else 0.0
+    summary["megabytes_per_second"] = summary["bytes"] / 1e6 / seconds if seconds else 0.0
+    return summary
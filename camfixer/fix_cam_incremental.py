@@ -0,0 +1,219 @@
+"""This module fixes a new revision of a cam file reusing the blocks that did not change since the last run."""
+
+import hashlib
+import json
+import os
+import tempfile
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import shapely
+
+from camfixer.block import Block
+from camfixer.block_generator import blocks_from_segments
+from camfixer.check_cam import _last_point
+from camfixer.check_lead_ins import _lead_in_points, check_lead_ins
+from camfixer.fix_lead_ins import fix_lead_ins
+from camfixer.get_hierarchy import set_hierarchy
+from camfixer.result_cache import fixer_version
+from camfixer.save_cam import save_cam
+from camfixer.segment_cam import segment_cam
+from camfixer.stage_metrics import NO_METRICS
+from camfixer.tessellate_path import CHORD_TOLERANCE, tessellate_path
+
+
+def _fingerprint(segment: Dict[str, List[str]]) -> str:
+    lines = segment["initial"] + segment["start"] + segment["arc"] + segment["main"] + segment["end"]
+    return hashlib.blake2b("\n".join(lines).encode(), digest_size=16).hexdigest()
+
+
+def _box(segment: Dict[str, List[str]], tolerance: float) -> List[float]:
+    """The [min_x, max_x, min_y, max_y] of the polygon of a block, the same as its Block.polygon."""
+    start = _last_point(segment["initial"] + segment["arc"])
+    points = tessellate_path(segment["main"], start, tolerance)
+    if not points:
+        return [np.inf, -np.inf, np.inf, -np.inf]
+    xs, ys = zip(*points)
+    return [min(xs), max(xs), min(ys), max(ys)]
+
+
+def _fixed_box(block: Block, tolerance: float) -> List[float]:
+    """The [min_x, max_x, min_y, max_y] of the polygon of a fixed block and of its lead-in."""
+    lead_in = shapely.MultiPoint(_lead_in_points(block, tolerance))
+    min_x, min_y, max_x, max_y = shapely.total_bounds([block.polygon, lead_in]).tolist()
+    return [min_x, max_x, min_y, max_y]
+
+
+def _overlapping(boxes: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """True for the boxes that overlap one of the other boxes."""
+    overlaps = np.zeros(len(boxes), dtype=bool)
+    for min_x, max_x, min_y, max_y in others:
+        overlaps |= (
+            (boxes[:, 0] <= max_x) & (boxes[:, 1] >= min_x) & (boxes[:, 2] <= max_y) & (boxes[:, 3] >= min_y)
+        )
+    return overlaps
+
+
+def _load_state(state_file, tolerance: float, decimals: Optional[int]):
+    """Get the blocks of the last run, or None if there is no state for this fixer, tolerance and decimals."""
+    try:
+        state = json.loads(Path(state_file).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if (
+        state.get("version") != fixer_version()
+        or state.get("tolerance") != tolerance
+        or state.get("decimals") != decimals
+    ):
+        return None
+    return state["blocks"]
+
+
+def _save_state(state_file, tolerance: float, decimals: Optional[int], blocks: List[Dict]):
+    state_file = Path(state_file)
+    descriptor, temp_file = tempfile.mkstemp(
+        dir=state_file.parent, prefix=f".{state_file.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+            json.dump(
+                {"version": fixer_version(), "tolerance": tolerance, "decimals": decimals, "blocks": blocks},
+                file,
+            )
+        os.replace(temp_file, state_file)
+    except BaseException:
+        Path(temp_file).unlink(missing_ok=True)
+        raise
+
+
+def fix_cam_incremental(
+    input_filepath,
+    output_filepath,
+    state_file,
+    tolerance=CHORD_TOLERANCE,
+    metrics=NO_METRICS,
+    decimals=None,
+) -> Dict[str, int]:
+    """Fix a cam file reusing the fixed text of the blocks that did not change since the last run.
+
+    The state of the last run keeps, for each block, the fingerprint of its input lines,
+    the bounding box of its polygon and of its fixed lead-in, and its fixed text. The blocks of the new file are
+    matched with it by fingerprint: the unmatched blocks of the new file were added or
+    changed, the unmatched blocks of the state were removed or changed.
+
+    Only the blocks whose bounding box overlaps one of those changes are fixed again, all
+    together. Their containers overlap the changes too, since a container's box holds
+    the box of the block, so their nesting is complete. The other blocks keep their
+    depth and reuse their text. Without a valid state every block is fixed.
+
+    The fixed lead-ins are checked with check_lead_ins against the fixed blocks and the
+    reused blocks whose box they reach, as in a normal fix. The box of a block holds its
+    lead-in, so a reused lead-in that reaches a changed contour is fixed and checked again.
+
+    Args:
+        input_filepath (str): The path to the cam file to fix.
+        output_filepath (str): The path where the fixed cam file is saved.
+        state_file (str): The path of the state, read if it exists and written after the run.
+        tolerance (float): The maximum distance between the arcs and the chords of the polygons.
+        metrics (StageMetrics): Records the time of each stage.
+        decimals (Optional[int]): Fix the blocks in fixed point with these decimals, see
+            fix_cam; a state saved with other decimals is not used.
+    Returns:
+        Dict[str, int]: The number of "blocks", of blocks "reused" from the last run, of
+        blocks "added" or changed, of blocks "removed" or changed, and of blocks "fixed" again.
+    """
+    with metrics.stage("segment"):
+        with open(input_filepath, "r", encoding="utf-8") as file:
+            segments = list(segment_cam(file))
+        fingerprints = [_fingerprint(segment) for segment in segments]
+
+    with metrics.stage("incremental"):
+        previous = _load_state(state_file, tolerance, decimals)
+    boxes = np.empty((len(segments), 4))
+    texts = [None] * len(segments)
+    if previous is None:
+        affected = np.ones(len(segments), dtype=bool)
+        added = len(segments)
+        removed = 0
+    else:
+        with metrics.stage("incremental"):
+            # Matches the blocks by fingerprint; repeated blocks are matched in order.
+            unmatched = defaultdict(deque)
+            for index, block in enumerate(previous):
+                unmatched[block["fingerprint"]].append(index)
+            is_new = np.zeros(len(segments), dtype=bool)
+            for index, fingerprint in enumerate(fingerprints):
+                if unmatched[fingerprint]:
+                    block = previous[unmatched[fingerprint].popleft()]
+                    boxes[index] = block["box"]
+                    texts[index] = block["text"]
+                else:
+                    boxes[index] = _box(segments[index], tolerance)
+                    is_new[index] = True
+            gone = [previous[index]["box"] for indices in unmatched.values() for index in indices]
+            changes = np.concatenate((boxes[is_new], np.array(gone).reshape(-1, 4)))
+
+            # The blocks whose box overlaps the box of an added or removed block.
+            affected = is_new | _overlapping(boxes, changes)
+            added = int(is_new.sum())
+            removed = len(gone)
+
+    indices = np.flatnonzero(affected).tolist()
+    if indices:
+        blocks = list(
+            blocks_from_segments([segments[index] for index in indices], tolerance, metrics, decimals)
+        )
+        for block, index in zip(blocks, indices):
+            block.num_block = index + 1
+        with metrics.stage("containment"):
+            set_hierarchy(blocks)
+        fixed = list(metrics.timed("lead_ins", fix_lead_ins(blocks, decimals)))
+        with metrics.stage("collisions"):
+            # The lead-ins are checked against the contours of the reused blocks they reach too.
+            reached = np.array([_fixed_box(block, tolerance) for block in fixed]).reshape(-1, 4)
+            near = np.flatnonzero(~affected & _overlapping(boxes, reached)).tolist()
+            # Only their polygons are needed, they are not counted as parsed blocks.
+            contours = list(
+                blocks_from_segments([segments[index] for index in near], tolerance, decimals=decimals)
+            )
+            for block, index in zip(contours, near):
+                block.num_block = index + 1
+        checked = metrics.timed(
+            "collisions",
+            check_lead_ins(fixed, blocks + contours, tolerance, metrics=metrics, decimals=decimals),
+        )
+        for block, index in zip(checked, indices):
+            if block.lead_in_fixed:
+                metrics.count("blocks_modified")
+            boxes[index] = _fixed_box(block, tolerance)
+            texts[index] = block.text
+
+    num_blocks = save_cam(
+        ({"text": text} for text in texts), output_filepath, atomic=True, metrics=metrics
+    )
+    # The fixed blocks were already counted by blocks_from_segments.
+    metrics.count("blocks", num_blocks - len(indices))
+    with metrics.stage("incremental"):
+        _save_state(
+            state_file,
+            tolerance,
+            decimals,
+            [
+                {"fingerprint": fingerprint, "box": box, "text": text}
+                for fingerprint, box, text in zip(fingerprints, boxes.tolist(), texts)
+            ],
+        )
+    metrics.stop()
+    return {
+        "blocks": num_blocks,
+        "reused": num_blocks - len(indices),
+        "added": added,
+        "removed": removed,
+        "fixed": len(indices),
+    }
+
+
+if __name__ == "__main__":
+    print(fix_cam_incremental("archivo.cam", "output.cam", "archivo.cam.state.json"))
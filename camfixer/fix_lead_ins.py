@@ -0,0 +1,146 @@
+"""This module moves the lead-ins of the blocks to the correct side of their contour."""
+
+import cmath
+import math
+from typing import Iterable, Iterator, Optional
+
+from shapely.geometry import Point
+
+from camfixer.block import Block
+from camfixer.fixed_point import format_coordinate
+
+
+def fix_lead_ins(blocks: Iterable[Block], decimals: Optional[int] = None) -> Iterator[Block]:
+    """Esta funcion corrige el arco de entrada de cada bloque segun si es pieza o agujero.
+    The blocks must already have their nesting set by set_hierarchy: holes get the lead-in
+    inside their contour and outer contours outside it.
+    Args:
+        blocks (Iterable[Block]): The blocks of the cam file, in the order of the file.
+        decimals (Optional[int]): The decimals of the fixed-point mode, the new coordinates
+            are rounded to them with format_coordinate; None writes them with one decimal.
+    Yields:
+        Block: Each block, with its lead-in fixed if it was on the wrong side.
+    """
+
+    #################### Funcion para corregir el arco ##############################
+    def corregir_arco(ini, distancia, direccion) -> Point:
+        x, y = ini.x, ini.y
+        x_nuevo = x + distancia * cmath.cos(direccion)
+        y_nuevo = y + distancia * cmath.sin(direccion)
+        nuevo_ini = Point(x_nuevo.real, y_nuevo.real)
+
+        return nuevo_ini
+
+    def formato(value: float) -> str:
+        return format_coordinate(value, decimals)
+
+    ##################Termina funcion########################################
+    #########Impresion en pantalla para verificacion visual############
+
+    ############################# Modificacion del arco y de sangria segun el sentido de giro ###################################
+    for block in blocks:
+        # Transformo los datos para tenes los puntos donde pincha y hacia donde se mueve.
+        arco2 = block["arco2"]
+
+        arco1 = block["arco1"]
+        ini = block["ini_coordinates"]
+        x1, y1 = ini.bounds[:2]
+        x2, y2 = arco1.bounds[:2]
+        x3, y3 = arco2.bounds[:2]
+
+        # Me pregunto si el recorrido es un recorrido interior.
+        if block["is_piece"]:
+            # print(f"El bloque {block['num_block']} es una pieza y esta contenido dentro del bloque {block['contained_in']}\n")
+
+            # Me pregnuto si el recorrido tiene el arco por fuera de su propio recorrido.
+            if block["is_arc_in"] == False:
+                print(
+                    f"\n El bloque {block['num_block']} es un agujero y tiene el arco por fuera, se tiene que modificar. \n"
+                )
+                print(
+                    f"\n Las coordenadas del punto inicial son {x1, y1}, se mueve hacia {x2, y2} y luego hasta {x3, y3}. Siendo estas ultimas el primer punto del recorrido principal."
+                )
+
+                # Calculo la distancia y la direccion entre el punto inicial y el final.
+                direccion = math.atan2(y3 - y1, x3 - x1)
+                distancia = arco2.distance(ini)
+                # print(f"\nLa distancia entre el arco2 y el ini es {distancia}")
+                # print(f"\n Y la direccion entre los dos puntos es {direccion} radianes respecto a al horizonatal. en sentido antihorario")
+
+                block["nuevo_ini"] = corregir_arco(arco2, distancia, direccion)
+
+                print(
+                    f"\nLa nueva coordenada inicial del bloque {block['num_block']} es {block['nuevo_ini']}"
+                )
+
+                RADIANES_90GRADOS = 1.5708
+                # Me pregnuto si se recorre en sentido horario.
+                if block["orientacion"] == "horaria":
+                    print(
+                        f"\nEl bloque {block['num_block']} se esta recorriendo en sentido horario. Y al ser un agujero debe tener sangria derecha. G42"
+                    )
+                    block["start"][0] = "G42"
+                    direccion = direccion + RADIANES_90GRADOS
+                    nuevo_arc1 = corregir_arco(block["nuevo_ini"], distancia, direccion)
+                    block["arc"][0] = f"G01X{formato(nuevo_arc1.x)}Y{formato(nuevo_arc1.y)}"
+                    block["arc"][1] = f"G02X{formato(x3)}Y{formato(y3)}I{formato(block['nuevo_ini'].x)}J{formato(block['nuevo_ini'].y)}"
+
+                # El recorrido va en contra de las agujas del reloj si llego a este punto.
+                else:
+                    print(
+                        f"\nEl bloque {block['num_block']} se esta recorriendo en sentido antihorario. Y al ser un agujero debe tener sangria derecha. G41"
+                    )
+                    block["start"][0] = "G41"
+                    direccion = direccion - RADIANES_90GRADOS
+                    nuevo_arc1 = corregir_arco(block["nuevo_ini"], distancia, direccion)
+                    block["arc"][0] = f"G01X{formato(nuevo_arc1.x)}Y{formato(nuevo_arc1.y)}"
+                    block["arc"][
+                        1
+                    ] = f"G03X{formato(x3)}Y{formato(y3)}I{formato(block['nuevo_ini'].x)}J{formato(block['nuevo_ini'].y)}"
+
+                block["initial"] = [f"G00X{formato(block['nuevo_ini'].x)}Y{formato(block['nuevo_ini'].y)}"]
+                block["lead_in_fixed"] = True
+
+        # El recorrido es un recorrido exterior si llego a este punto.
+        else:
+            if block["is_arc_in"]:
+                print(
+                    f"El bloque {block['num_block']} es una pieza exterior y el arco esta por dentro, se tiene que modificar \n"
+                )
+
+                # Calculo la distancia y la direccion entre el punto inicial y el final.
+                direccion = math.atan2(y3 - y1, x3 - x1)
+                distancia = arco2.distance(ini)
+
+                block["nuevo_ini"] = corregir_arco(arco2, distancia, direccion)
+                print(
+                    f"\nLa nueva coordenada inicial del bloque {block['num_block']} es {block['nuevo_ini']}"
+                )
+        #######################################################################################################################################
+        print(
+            f"las coordenadas del centro de la figura del bloque {block['num_block']} es {block['centro']}"
+        )
+
+        #############################   Modificacion del arco para agujeros interiores     ##################################################
+        # def resta(poly1: Point, poly2: Point) -> float:
+        #     return poly1.contains(poly2)
+        # for block in blocks:
+        #     if block['is_piece'] and block['is_arc_in']==False:
+        #         if resta(block["arco2"], block["ini_coordinates"]):
+
+        # print(f"Las coordenadas del punto inicial son {block['ini_coordinates']}")
+        # print(f"Las lineas de codigo del arco son {block['arco1']} y {block['arco2']}")
+
+        # Imprimir o usar el resultado
+        # print(f"La resta es {}")
+
+        # print(f"El bloque {block['num_block']} ya se encuentra con el arco bien posicionado")
+
+        # 'text' se arma a partir de las lineas cuando se escribe el bloque, ya tiene los cambios.
+
+        # Imprime en pantalla todos los bloques generados.
+        # print("bloque generado: ", block)
+        # block["contained_in"] = is_piece(block, blocks)
+
+        yield block
+
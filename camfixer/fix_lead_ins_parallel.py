@@ -0,0 +1,90 @@
+"""This module fixes the lead-ins of the blocks in a pool of worker processes."""
+
+import contextlib
+import dataclasses
+import io
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import List, Optional, Tuple
+
+from camfixer.block import Block
+from camfixer.fix_lead_ins import fix_lead_ins
+
+# Files with fewer blocks are fixed in this process, a pool costs more than it saves.
+PARALLEL_MIN_BLOCKS = 10000
+# Number of blocks sent to a worker at a time.
+LEAD_IN_CHUNK = 2000
+
+Changes = Tuple[List[str], List[str], List[str], object, bool]
+
+
+def _fix_chunk(blocks: List[Block], decimals: Optional[int] = None) -> Tuple[List[Changes], str]:
+    """Runs in a worker: fixes a chunk of blocks and sends back only what fix_lead_ins changes.
+    The messages of fix_lead_ins are captured and sent back too, to be printed in order."""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        changes = [
+            (block.initial, block.start, block.arc, block.nuevo_ini, block.lead_in_fixed)
+            for block in fix_lead_ins(blocks, decimals)
+        ]
+    return changes, output.getvalue()
+
+
+def fix_lead_ins_parallel(
+    blocks: List[Block],
+    workers: Optional[int] = None,
+    chunk_size: int = LEAD_IN_CHUNK,
+    decimals: Optional[int] = None,
+):
+    """Esta funcion corrige los arcos de entrada como fix_lead_ins, repartiendo los bloques entre procesos.
+    Each block only needs its own fields once set_hierarchy has run, so the blocks are
+    fixed in chunks by a pool of processes. The chunks are sent without the polygon and
+    the main path, which fix_lead_ins does not use, and the results are applied to the
+    blocks in the order of the file, so the output is the same as the serial one.
+    Small files, or workers=1, use fix_lead_ins in this process.
+    Args:
+        blocks (List[Block]): The blocks of the cam file, with their nesting set.
+        workers (Optional[int]): The number of worker processes, by default one per CPU.
+        chunk_size (int): The number of blocks sent to a worker at a time.
+        decimals (Optional[int]): The decimals of the fixed-point mode, see fix_lead_ins.
+    Yields:
+        Block: Each block, with its lead-in fixed if it was on the wrong side.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(blocks) < PARALLEL_MIN_BLOCKS:
+        yield from fix_lead_ins(blocks, decimals)
+        return
+
+    chunks = (
+        [
+            dataclasses.replace(block, polygon=None, main_text="")
+            for block in blocks[start : start + chunk_size]
+        ]
+        for start in range(0, len(blocks), chunk_size)
+    )
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        offset = 0
+        for changes, output in pool.map(partial(_fix_chunk, decimals=decimals), chunks):
+            sys.stdout.write(output)
+            for block, (initial, start, arc, nuevo_ini, lead_in_fixed) in zip(
+                blocks[offset : offset + len(changes)], changes
+            ):
+                block.initial = initial
+                block.start = start
+                block.arc = arc
+                block.nuevo_ini = nuevo_ini
+                block.lead_in_fixed = lead_in_fixed
+                yield block
+            offset += len(changes)
+
+
+if __name__ == "__main__":
+    from camfixer.block_generator import _block_generator
+    from camfixer.get_hierarchy import set_hierarchy
+
+    blocks = list(_block_generator("archivo.cam"))
+    set_hierarchy(blocks)
+    for block in fix_lead_ins_parallel(blocks):
+        print(block.num_block, block.nuevo_ini)
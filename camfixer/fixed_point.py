@@ -0,0 +1,109 @@
+"""This module converts the coordinates of a cam file to and from integers in units of a fixed resolution.
+
+With one decimal, the PEAK format, a coordinate is stored as an integer number of tenths
+of a millimetre: "X+1928.2" is 19282. The integers are read from the text without going
+through a float and written back digit by digit, so a coordinate that is not changed is
+written exactly as it was read.
+"""
+
+import re
+from typing import List, Optional
+
+import numpy as np
+
+# Decimals of the coordinates of the PEAK files: tenths of a millimetre.
+DECIMALS = 1
+# The value of a coordinate that is missing from its line, like NaN for the floats.
+MISSING = np.iinfo(np.int64).min
+
+
+def scale(decimals: int) -> int:
+    """The number of units in a millimetre."""
+    return 10**decimals
+
+
+def parse_fixed(fields: List[Optional[str]], decimals: int = DECIMALS) -> np.ndarray:
+    """Convert the numbers captured from the motion lines to integers, in one call.
+
+    Args:
+        fields (List[Optional[str]]): The numbers, e.g. "+1928.2", None for a missing one.
+        decimals (int): The decimals of the numbers, at least 1.
+    Returns:
+        np.ndarray: The int64 values in units of 10**-decimals mm, MISSING for None.
+    Raises:
+        ValueError: If decimals is less than 1, or a number is not a sign, digits, a dot
+            and exactly `decimals` digits, so it cannot be stored without rounding or
+            written back the same.
+    """
+    if decimals < 1:
+        raise ValueError(f"Los decimales tienen que ser al menos 1: {decimals}")
+    # The missing numbers are a "*" until the whole text is checked.
+    text = " ".join(field or "*" for field in fields)
+    number = rf"[+-]?\d+\.\d{{{decimals}}}"
+    # One space between each two fields, so a field with a space in it is not two numbers.
+    separated = text.count(" ") == max(len(fields) - 1, 0)
+    if not (separated and re.fullmatch(rf"(?:(?:{number}|\*)(?: |\Z))*", text)):
+        wrong = next(field for field in fields if field and not re.fullmatch(number, field))
+        raise ValueError(f"La coordenada {wrong!r} no es un numero con {decimals} decimales")
+    if not text:
+        return np.empty(0, dtype=np.int64)
+    return np.fromstring(text.replace(".", "").replace("*", str(MISSING)), dtype=np.int64, sep=" ")
+
+
+def to_fixed(values, decimals: int = DECIMALS) -> np.ndarray:
+    """Round coordinates in mm to integer units, the halves away from zero.
+
+    Args:
+        values (np.ndarray): The coordinates in mm, e.g. computed by fix_lead_ins.
+        decimals (int): The decimals of the units.
+    Returns:
+        np.ndarray: The int64 values in units of 10**-decimals mm.
+    """
+    # The product is rounded to a millionth of a unit first, so 1.25 * 10 = 12.499999...
+    # rounds up like the decimal number it comes from.
+    values = np.round(np.asarray(values, dtype=np.float64) * scale(decimals), 6)
+    return (np.sign(values) * np.floor(np.abs(values) + 0.5)).astype(np.int64)
+
+
+def to_float(values: np.ndarray, decimals: int = DECIMALS) -> np.ndarray:
+    """Convert integer units to mm, NaN for MISSING.
+
+    Every value becomes the float closest to its decimal number, the same float that
+    parsing its text gives, so the geometry is the same as with the float coordinates.
+    """
+    result = values / scale(decimals)
+    result[values == MISSING] = np.nan
+    return result
+
+
+def format_fixed(value: int, decimals: int = DECIMALS, negative: bool = False) -> str:
+    """Write integer units as a signed number with `decimals` decimals, e.g. 19282 as "+1928.2".
+    A zero read as "-0.0" is written back with its sign if `negative` is True."""
+    digits = str(abs(value)).rjust(decimals + 1, "0")
+    sign = "-" if value < 0 or negative else "+"
+    if not decimals:
+        return sign + digits
+    return f"{sign}{digits[:-decimals]}.{digits[-decimals:]}"
+
+
+def format_coordinate(value: float, decimals: Optional[int] = None) -> str:
+    """Write a coordinate in mm computed by the fixer.
+
+    Args:
+        value (float): The coordinate in mm.
+        decimals (Optional[int]): The decimals of the fixed-point mode; None writes one
+            decimal with the float formatting, as the fixer always did.
+    Returns:
+        str: The signed number, e.g. "+1928.2".
+    """
+    if decimals is None:
+        return f"{value:+.1f}"
+    return format_fixed(int(to_fixed(value, decimals)), decimals)
+
+
+if __name__ == "__main__":
+    values = parse_fixed(["+1928.2", "-0.5", None, "+12.0"])
+    print(values)
+    print([format_fixed(value) for value in values[values != MISSING].tolist()])
+    print(format_coordinate(1.25, 1), format_coordinate(1.25))
+    # Output: +1.3 +1.2
@@ -0,0 +1,50 @@
+"""This module finds the pairs of blocks where one contains the other, using a spatial index over the block polygons."""
+
+from typing import List, Tuple
+
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry import Polygon
+
+from camfixer.get_max_min import get_max_min_polygons
+from camfixer.is_piece import is_inside_array
+
+
+def get_containment_pairs(polygons: List[Polygon]) -> Tuple[np.ndarray, np.ndarray]:
+    """Find every pair of polygons where one contains the other.
+
+    The containment test runs in three stages, each cheaper than the next and run on
+    fewer pairs: an STRtree query gives the pairs whose envelopes intersect, the
+    bounding boxes of all the polygons rule out the pairs where one box is not inside
+    the other, and only the pairs left get the exact `contains` on prepared geometries.
+
+    Args:
+        polygons (List[Polygon]): The polygons of the blocks, in file order.
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The indices of the containers and of the polygons
+        they contain, pair by pair. A polygon is never paired with itself.
+    """
+    if not polygons:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    geometries = np.asarray(polygons, dtype=object)
+    tree = STRtree(geometries)
+    containers, contents = tree.query(geometries)
+
+    max_min = get_max_min_polygons(geometries)
+    candidates = (containers != contents) & is_inside_array(
+        max_min[contents], max_min[containers]
+    )
+    containers, contents = containers[candidates], contents[candidates]
+
+    shapely.prepare(geometries)
+    contained = shapely.contains(geometries[containers], geometries[contents])
+    return containers[contained], contents[contained]
+
+
+if __name__ == "__main__":
+    square = Polygon([(0, 0), (0, 10), (10, 10), (10, 0)])
+    hole = Polygon([(2, 2), (2, 4), (4, 4), (4, 2)])
+    print(get_containment_pairs([square, hole]))
+    # Output: (array([0]), array([1]))
@@ -1,6 +1,6 @@
 """This module contains the function to get the coordinates from a cam file (one line)."""
 
-import re
+from camfixer.segment_cam import MOTION_PATTERN
 
 
 def get_coordinates(line):
@@ -14,12 +14,9 @@ def get_coordinates(line):
     
     """
     
-    # pattern = r"G0[0123]X([+-]?\d+\.\d+)Y([+-]?\d+\.\d+)I([+-]?\d+\.\d+)J([+-]?\d+\.\d+)"
-    pattern = r"G0[0123]X([+-]?\d+\.\d+)Y([+-]?\d+\.\d+)(I([+-]?\d+\.\d+))?(J([+-]?\d+\.\d+))?"
-    match = re.search(pattern, line)
+    match = MOTION_PATTERN.search(line)
     if match:
-        x, y, _, i, _, j = match.groups()
-        # x, y, i, j = match.groups()
+        _, x, y, i, j = match.groups()
         if i and j:
             return float(x), float(y), float(i), float(j)
         else:
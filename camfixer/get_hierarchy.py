@@ -0,0 +1,82 @@
+"""This module builds the nesting tree of the contours: the direct parent and the depth of each block."""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+from shapely.geometry import Polygon
+
+from camfixer.get_containment_pairs import get_containment_pairs
+
+
+def get_hierarchy(polygons: List[Polygon]) -> Tuple[List[Optional[int]], np.ndarray]:
+    """Find the direct parent and the nesting depth of every polygon.
+
+    The polygons are processed in descending area order, so a container is always done
+    before the polygons inside it: the direct parent of a polygon is its smallest
+    container and its depth is the depth of that parent plus one. Depth 0 are the
+    outermost contours; even depths are outer contours and odd depths are holes.
+    Polygons with the same area are ordered by their position in the file.
+
+    Args:
+        polygons (List[Polygon]): The polygons of the blocks, in file order.
+    Returns:
+        Tuple[List[Optional[int]], np.ndarray]: For each polygon, the index of its direct
+        parent (or None) and its depth.
+    """
+    n_polygons = len(polygons)
+    parents = np.full(n_polygons, -1, dtype=np.int64)
+    depths = np.zeros(n_polygons, dtype=np.int64)
+    if not polygons:
+        return [], depths
+
+    areas = np.array([polygon.area for polygon in polygons])
+    order = np.lexsort((np.arange(n_polygons), -areas))
+    rank = np.empty(n_polygons, dtype=np.int64)
+    rank[order] = np.arange(n_polygons)
+
+    # A container always comes before its contents; this also breaks ties between equal polygons.
+    containers, contents = get_containment_pairs(polygons)
+    before = rank[containers] < rank[contents]
+    containers, contents = containers[before], contents[before]
+
+    # The direct parent is the container processed last, the one with the smallest area.
+    if contents.size:
+        pairs = np.lexsort((rank[containers], contents))
+        containers, contents = containers[pairs], contents[pairs]
+        last = np.append(contents[1:] != contents[:-1], True)
+        parents[contents[last]] = containers[last]
+
+    for index in order:
+        if parents[index] >= 0:
+            depths[index] = depths[parents[index]] + 1
+
+    return [int(parent) if parent >= 0 else None for parent in parents], depths
+
+
+def set_hierarchy(blocks) -> None:
+    """Set the nesting of every block from the hierarchy of their polygons.
+
+    Each block gets its depth, is_piece (odd depths are holes, a part inside a hole is
+    an outer contour again) and contained_in, the num_block of its direct parent.
+
+    Args:
+        blocks (List[Block]): The blocks of the cam file, in file order.
+    """
+    # Arbol de anidamiento: cada bloque guarda su contenedor directo y su profundidad.
+    # Profundidad par = recorrido exterior, impar = agujero (una pieza dentro de un agujero vuelve a ser exterior).
+    parents, depths = get_hierarchy([block.polygon for block in blocks])
+    for block, parent, depth in zip(blocks, parents, depths.tolist()):
+        block.depth = depth
+        block.is_piece = depth % 2 == 1
+        if parent is not None:
+            # print(f"Entonces el bloque {block.num_block} esta contenido dentro de {blocks[parent].num_block}")
+            block.contained_in = blocks[parent].num_block
+
+
+if __name__ == "__main__":
+    sheet = Polygon([(0, 0), (0, 100), (100, 100), (100, 0)])
+    part = Polygon([(10, 10), (10, 90), (90, 90), (90, 10)])
+    hole = Polygon([(20, 20), (20, 80), (80, 80), (80, 20)])
+    nested = Polygon([(30, 30), (30, 40), (40, 40), (40, 30)])
+    print(get_hierarchy([nested, hole, sheet, part]))
+    # Output: ([1, 3, None, 2], array([3, 2, 0, 1]))
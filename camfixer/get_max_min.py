@@ -2,7 +2,10 @@
 
 from typing import List, Dict
 
-from camfixer.get_WKT import get_WKT
+import numpy as np
+import shapely
+
+from camfixer.tokenize_cam import tokenize_cam
 
 
 def get_max_min(main_block: List[str]) -> Dict[str, float]:
@@ -12,29 +15,44 @@ def get_max_min(main_block: List[str]) -> Dict[str, float]:
     Returns:
         Dict[str, float]: A dictionary with the maximum and minimum coordinates.
     """
+    tokens = tokenize_cam(main_block)
+    is_motion = tokens["g"] >= 0
+    if not is_motion.any():
+        return {
+            "min_x": float("inf"),
+            "max_x": float("-inf"),
+            "min_y": float("inf"),
+            "max_y": float("-inf"),
+        }
+
+    # The lines were parsed once, the limits are reductions over the coordinates.
+    x = tokens["x"][is_motion]
+    y = tokens["y"][is_motion]
     result = {
-        "min_x": float("inf"),
-        "max_x": float("-inf"),
-        "min_y": float("inf"),
-        "max_y": float("-inf"),
+        "min_x": float(x.min()),
+        "max_x": float(x.max()),
+        "min_y": float(y.min()),
+        "max_y": float(y.max()),
     }
-    # Iterates over the lines of the main block.
-    for line in main_block:
-        # Gets the coordinates from the line.
-        coordinates = get_WKT(line)
-        # print(f"Coordinates dentro de get max min son:",coordinates)
-        if coordinates:
-            x, y, *_ = coordinates
-            # Updates the maximum and minimum coordinates.
-            result["min_x"] = min(result["min_x"], x)
-            result["max_x"] = max(result["max_x"], x)
-            result["min_y"] = min(result["min_y"], y)
-            result["max_y"] = max(result["max_y"], y)
 
     # print(f"Las coordenadas maximas y minimas en los ejes X e Y en el siguiente orden -> MIN MAX X, MIN MAX Y. ", result )
     return result
 
 
+def get_max_min_polygons(polygons) -> np.ndarray:
+    """This function calculates the maximum and minimum coordinates of many polygons at once.
+    Unlike the main path coordinates, the polygons include the points of the tessellated arcs,
+    so an arc that bulges past the ends of its line is inside the box of its block.
+    args:
+        polygons (Sequence[Polygon]): The polygons of the blocks.
+    Returns:
+        np.ndarray: An (n, 4) array, each row is [min_x, max_x, min_y, max_y].
+    """
+    bounds = shapely.bounds(np.asarray(polygons, dtype=object)).reshape(-1, 4)
+    # shapely orders them as [min_x, min_y, max_x, max_y].
+    return bounds[:, [0, 2, 1, 3]]
+
+
 if __name__ == "__main__":
     block = [
         "G01X+1928.2Y-892.4",
@@ -0,0 +1,81 @@
+"""This module calculates the direction in which the main path of a block is cut, and its center."""
+
+from typing import Dict
+
+import numpy as np
+
+from camfixer.cam_program import CamProgram
+
+
+def get_orientacion(ncoordinates, centro_x, centro_y) -> str:
+    producto_cruzado = sum(
+        (x2 - centro_x) * (y1 - centro_y) - (x1 - centro_x) * (y2 - centro_y)
+        for (x1, y1), (x2, y2) in zip(
+            ncoordinates, ncoordinates[1:] + [ncoordinates[0]]
+        )
+    )
+    # print(f"El resultado del producto cruz total de todos los vectores es ",producto_cruzado)
+
+    # Determina la orientación
+    orientacion = (
+        "antihoraria"
+        if producto_cruzado < 0
+        else "horaria" if producto_cruzado > 0 else "indeterminada"
+    )
+
+    return orientacion
+
+
+def get_orientacion_program(program: CamProgram) -> Dict[str, np.ndarray]:
+    """Calculate the center, signed area and orientation of the main path of every block at once.
+
+    The main paths are compacted into one segmented array and every sum is a bincount
+    over the block ids, which adds the terms in the same order as get_orientacion.
+
+    Args:
+        program (CamProgram): The parsed cam program.
+    Returns:
+        Dict[str, np.ndarray]: For each block, "centro" is the (x, y) average of the main
+        path, "area" the signed area (positive for counterclockwise paths) and
+        "orientacion" is "horaria", "antihoraria" or "indeterminada".
+    """
+    n_blocks = program.n_blocks
+    block_ids = np.repeat(np.arange(n_blocks), np.diff(program.offsets))
+    rows = np.arange(program.n_rows)
+    is_main = (rows >= program.main_offsets[block_ids]) & (program.g >= 0)
+
+    ids = block_ids[is_main]
+    x = program.x[is_main]
+    y = program.y[is_main]
+    counts = np.bincount(ids, minlength=n_blocks)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        centro_x = np.bincount(ids, weights=x, minlength=n_blocks) / counts
+        centro_y = np.bincount(ids, weights=y, minlength=n_blocks) / counts
+
+    # The next point of each point; the last point of a path closes it with the first one.
+    starts = np.cumsum(counts) - counts
+    following = np.arange(1, len(ids) + 1)
+    has_points = counts > 0
+    following[(starts + counts - 1)[has_points]] = starts[has_points]
+
+    dx = x - centro_x[ids]
+    dy = y - centro_y[ids]
+    producto_cruzado = np.bincount(
+        ids, weights=dx[following] * dy - dx * dy[following], minlength=n_blocks
+    )
+
+    orientacion = np.full(n_blocks, "indeterminada", dtype=object)
+    orientacion[producto_cruzado < 0] = "antihoraria"
+    orientacion[producto_cruzado > 0] = "horaria"
+
+    return {
+        "centro": np.column_stack((centro_x, centro_y)),
+        "area": -producto_cruzado / 2,
+        "orientacion": orientacion,
+    }
+
+
+if __name__ == "__main__":
+    ncoordinates = [(0.0, 0.0), (0.0, 10.0), (10.0, 10.0), (10.0, 0.0)]
+    print(get_orientacion(ncoordinates, 5.0, 5.0))
+    # Output: horaria
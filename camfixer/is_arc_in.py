@@ -1,23 +1,112 @@
-from typing import List, Dict
-from shapely.geometry import Polygon
-from camfixer import get_WKT
+"""This module checks, for every block at once, if the point where the arc pierces is inside its own contour."""
+
+import numpy as np
+from shapely.geometry import Point, Polygon
+
+from camfixer.cam_program import INITIAL_ROW, CamProgram
+
+# The engine used by block_generator, "shapely" is kept to validate the ray casting.
+IS_ARC_IN_ENGINE = "numpy"
+
+
+def points_in_polygons(
+    points: np.ndarray, polygon_points: np.ndarray, polygon_offsets: np.ndarray
+) -> np.ndarray:
+    """Check if each point is inside its own polygon with the even-odd rule, for all the polygons in one call.
+
+    A ray from the point to the right crosses the contour an odd number of times if the
+    point is inside. Every edge of every polygon is tested against the point of its
+    polygon at once, and the crossings are counted per polygon. Like Shapely's contains,
+    a point on the contour, a NaN point or a polygon with fewer than 3 points gives False.
+    The side of an edge is a plain float cross product, so a point within rounding of a
+    slanted edge may be on the other side than with Shapely's exact predicates.
 
-def is_arc_in(block):
-    """Check if the coordinate from block_initial is contained within the polygon defined by block_main.
     Args:
-        block (dict): Dictionary containing block data.
+        points (np.ndarray): The (n, 2) points, one per polygon.
+        polygon_points (np.ndarray): The (m, 2) points of all the polygons, one after the other.
+        polygon_offsets (np.ndarray): The first point of each polygon, plus m.
     Returns:
-        bool: True if the coordinate is contained within the polygon, False otherwise.
+        np.ndarray: The n booleans, True if the point is inside its polygon.
     """
-    # Get the coordinate from the first line of block ("block_initial")
-    initial_coordinate = get_WKT(block["initial"][0])
+    n_polygons = len(polygon_offsets) - 1
+    counts = np.diff(polygon_offsets)
+    ids = np.repeat(np.arange(n_polygons), counts)
+
+    # Each point is the start of an edge that ends at the next point of its polygon,
+    # the last one goes back to the first.
+    ends = np.arange(1, len(polygon_points) + 1)
+    non_empty = counts > 0
+    ends[polygon_offsets[1:][non_empty] - 1] = polygon_offsets[:-1][non_empty]
+    x1, y1 = polygon_points[:, 0], polygon_points[:, 1]
+    x2, y2 = polygon_points[ends, 0], polygon_points[ends, 1]
+    px, py = points[ids, 0], points[ids, 1]
+
+    # The side of the edge where the point is: > 0 left, < 0 right, 0 aligned.
+    side = (x2 - x1) * (py - y1) - (y2 - y1) * (px - x1)
+    # An edge going up crosses the ray if the point is at its left, one going down if it
+    # is at its right; the ends are half-open so a vertex is only counted once.
+    upward = (y1 <= py) & (y2 > py)
+    downward = (y1 > py) & (y2 <= py)
+    crosses = (upward & (side > 0)) | (downward & (side < 0))
+    # The point is on an edge if it is aligned with it and between its ends.
+    on_edge = (
+        (side == 0)
+        & (np.minimum(x1, x2) <= px)
+        & (px <= np.maximum(x1, x2))
+        & (np.minimum(y1, y2) <= py)
+        & (py <= np.maximum(y1, y2))
+    )
+
+    inside = np.bincount(ids, weights=crosses, minlength=n_polygons) % 2 == 1
+    boundary = np.bincount(ids, weights=on_edge, minlength=n_polygons) > 0
+    return inside & ~boundary & (counts >= 3)
+
+
+def is_arc_in(
+    points: np.ndarray,
+    polygon_points: np.ndarray,
+    polygon_offsets: np.ndarray,
+    engine: str = IS_ARC_IN_ENGINE,
+) -> np.ndarray:
+    """Check if the pierce point of each block is inside the polygon of its main path.
+
+    Args:
+        points (np.ndarray): The (n, 2) pierce points, NaN for a block without one.
+        polygon_points (np.ndarray): The (m, 2) polygon points of all the blocks, from tessellate_arcs.
+        polygon_offsets (np.ndarray): The first polygon point of each block, plus m.
+        engine (str): "numpy" for points_in_polygons, or "shapely" for one Polygon.contains
+            per block, which is slower.
+    Returns:
+        np.ndarray: The n booleans, True if the arc is inside the contour.
+    """
+    if engine == "numpy":
+        return points_in_polygons(points, polygon_points, polygon_offsets)
+    if engine != "shapely":
+        raise ValueError(f"Motor desconocido: {engine}")
+
+    result = np.zeros(len(points), dtype=bool)
+    for index, (x, y) in enumerate(points.tolist()):
+        if polygon_offsets[index + 1] - polygon_offsets[index] < 3:
+            # Shapely cannot build a polygon with fewer points.
+            continue
+        polygon = Polygon(polygon_points[polygon_offsets[index] : polygon_offsets[index + 1]])
+        point = Point() if np.isnan(x) else Point(x, y)
+        result[index] = polygon.contains(point)
+    return result
+
 
-    # Get the polygon coordinates from block_main
-    polygon_coordinates = block["polygon"]
+def get_pierce_points(program: CamProgram) -> np.ndarray:
+    """Get the (n, 2) pierce points of the blocks of a program, NaN if the initial line has no motion."""
+    rows = program.offsets[:-1] + INITIAL_ROW
+    points = np.column_stack((program.x[rows], program.y[rows])).astype(float)
+    points[program.g[rows] < 0] = np.nan
+    return points
 
-    # Check if the initial coordinate is contained within the polygon
-    # (You would need to implement a function to check this, for example, using the Ray Casting algorithm)
-    # For demonstration purposes, let's assume it's True if the initial coordinate is in the polygon, False otherwise
-    is_arc_in = initial_coordinate in polygon_coordinates
 
-    return is_arc_in
+if __name__ == "__main__":
+    square = np.array([[0.0, 0.0], [10.0, 0.0], [10.0, 10.0], [0.0, 10.0]])
+    points = np.array([[5.0, 5.0], [15.0, 5.0], [10.0, 5.0]])
+    polygon_points = np.concatenate([square] * 3)
+    polygon_offsets = np.array([0, 4, 8, 12])
+    print(is_arc_in(points, polygon_points, polygon_offsets))
+    print(is_arc_in(points, polygon_points, polygon_offsets, engine="shapely"))
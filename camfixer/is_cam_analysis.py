@@ -0,0 +1,19 @@
+"""This module tells the analysis files saved by CamAnalysis from cam files, without loading numpy."""
+
+# The first bytes of an analysis file, and its usual suffix.
+MAGIC = b"CAMANAL1"
+ANALYSIS_SUFFIX = ".cama"
+
+
+def is_cam_analysis(path) -> bool:
+    """Check if a file is an analysis file, by its first bytes.
+    Args:
+        path (str): The path to the file.
+    Returns:
+        bool: True if the file starts with MAGIC.
+    """
+    try:
+        with open(path, "rb") as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
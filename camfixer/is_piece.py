@@ -2,6 +2,8 @@
 
 from typing import List, Dict
 
+import numpy as np
+
 
 def is_inside(max_min1: Dict[str,float], max_min2: Dict[str,float]) -> bool:
         """This function compare a block with another block to determine if it is contained within another.
@@ -20,6 +22,23 @@ def is_inside(max_min1: Dict[str,float], max_min2: Dict[str,float]) -> bool:
         )
 
 
+def is_inside_array(max_min1: np.ndarray, max_min2: np.ndarray) -> np.ndarray:
+        """This function is the vectorized is_inside: it compares many pairs of blocks at once.
+        Each row of the arrays is [min_x, max_x, min_y, max_y], as returned by get_max_min_polygons.
+        Args:
+            max_min1 (np.ndarray): An (n, 4) array with the max and min coordinates of the first blocks.
+            max_min2 (np.ndarray): An (n, 4) array with the max and min coordinates of the second blocks.
+        Returns:
+            np.ndarray: For each row, True if the first block is contained within the second block.
+        """
+        return (
+            (max_min1[:, 0] >= max_min2[:, 0])
+            & (max_min1[:, 1] <= max_min2[:, 1])
+            & (max_min1[:, 2] >= max_min2[:, 2])
+            & (max_min1[:, 3] <= max_min2[:, 3])
+        )
+
+
 def is_piece(block: Dict, blocks: List[Dict]) -> bool:
         """This function compare a block with all the other blocks to determine if it is contained within another.
         The structure of a block is a dictionary with this data:
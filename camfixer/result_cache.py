@@ -0,0 +1,175 @@
+"""This module keeps the fixed cam files on disk, so a file that was already fixed is not fixed again."""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+# The cache lives here unless CAMFIXER_CACHE_DIR or --cache-dir say otherwise.
+DEFAULT_CACHE_DIR = Path(os.environ.get("CAMFIXER_CACHE_DIR", Path.home() / ".cache" / "camfixer"))
+# Maximum size of the cached files, the least recently used are removed above it.
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+@lru_cache(maxsize=None)
+def fixer_version() -> str:
+    """Get a hash of the source of the fixer, so any change to the code gives new keys."""
+    digest = hashlib.sha256()
+    for source in sorted(Path(__file__).parent.glob("*.py")):
+        digest.update(source.name.encode())
+        digest.update(source.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def _copy_atomic(source: Path, target: Path):
+    """Copy a file through a temporary file next to the target, renamed when complete."""
+    descriptor, temp_file = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+    os.close(descriptor)
+    try:
+        shutil.copyfile(source, temp_file)
+        os.replace(temp_file, target)
+    except BaseException:
+        Path(temp_file).unlink(missing_ok=True)
+        raise
+
+
+@dataclass
+class ResultCache:
+    """A content-addressed cache of fixed cam files.
+
+    The key of a file is the hash of its bytes, the configuration of the fixer and the
+    version of its code, so a key never gives a stale result. Each entry is the fixed
+    file, `<key>.cam`, and its number of blocks, `<key>.json`. Reading an entry updates
+    its time, and when the cached files add up to more than max_bytes the least
+    recently used ones are removed. Entries are written with a rename, so several
+    processes can share one cache.
+
+    Attributes:
+        directory (Path): The directory of the cache.
+        max_bytes (int): The maximum size of the cached files.
+    """
+
+    directory: Path = DEFAULT_CACHE_DIR
+    max_bytes: int = DEFAULT_MAX_BYTES
+
+    def key(self, input_filepath, tolerance: float, optimize_order: bool = False, decimals=None) -> str:
+        """Get the key of a cam file for a configuration of the fixer.
+
+        Args:
+            input_filepath (str): The path to the cam file.
+            tolerance (float): The maximum distance between the arcs and the chords of the polygons.
+            optimize_order (bool): If the cut order of the blocks is optimized.
+            decimals (Optional[int]): The decimals of the fixed-point mode, None for floats.
+        Returns:
+            str: The hexadecimal hash of the file, the configuration and the fixer version.
+        """
+        digest = hashlib.sha256()
+        configuration = {
+            "tolerance": tolerance,
+            "optimize_order": optimize_order,
+            "decimals": decimals,
+            "version": fixer_version(),
+        }
+        digest.update(json.dumps(configuration, sort_keys=True).encode())
+        with open(input_filepath, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def get(self, key: str, output_filepath) -> Optional[int]:
+        """Copy the fixed file of a key to output_filepath, if it is in the cache.
+
+        Args:
+            key (str): The key of the cam file.
+            output_filepath (str): The path where the fixed cam file is saved.
+        Returns:
+            Optional[int]: The number of blocks of the file, or None if it is not cached.
+        """
+        cam_file = Path(self.directory) / f"{key}.cam"
+        try:
+            num_blocks = json.loads((Path(self.directory) / f"{key}.json").read_text())["blocks"]
+            _copy_atomic(cam_file, Path(output_filepath))
+        except (OSError, ValueError, KeyError):
+            return None
+        # Marks the entry as recently used.
+        cam_file.touch()
+        return num_blocks
+
+    def put(self, key: str, output_filepath, num_blocks: int):
+        """Store a fixed cam file and remove the oldest entries if the cache is too big.
+
+        Args:
+            key (str): The key of the input cam file.
+            output_filepath (str): The path of the fixed cam file.
+            num_blocks (int): The number of blocks of the file.
+        """
+        directory = Path(self.directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        # The file goes first, an entry only exists once its json is written.
+        _copy_atomic(Path(output_filepath), directory / f"{key}.cam")
+        descriptor, temp_file = tempfile.mkstemp(dir=directory, prefix=f".{key}.", suffix=".tmp")
+        with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+            json.dump({"blocks": num_blocks}, file)
+        os.replace(temp_file, directory / f"{key}.json")
+        self.evict()
+
+    def evict(self) -> int:
+        """Remove the least recently used entries until the cache fits in max_bytes.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        entries = []
+        for cam_file in Path(self.directory).glob("*.cam"):
+            try:
+                stat = cam_file.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, cam_file))
+        total = sum(size for _, size, _ in entries)
+
+        removed = 0
+        for _, size, cam_file in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            cam_file.with_suffix(".json").unlink(missing_ok=True)
+            cam_file.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def info(self) -> Dict:
+        """Get the state of the cache.
+
+        Returns:
+            Dict: The "directory", the number of "entries", their total "bytes" and "max_bytes".
+        """
+        sizes = [cam_file.stat().st_size for cam_file in Path(self.directory).glob("*.cam")]
+        return {
+            "directory": str(self.directory),
+            "entries": len(sizes),
+            "bytes": sum(sizes),
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self) -> int:
+        """Remove every entry of the cache.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        removed = 0
+        for cam_file in Path(self.directory).glob("*.cam"):
+            cam_file.with_suffix(".json").unlink(missing_ok=True)
+            cam_file.unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+
+if __name__ == "__main__":
+    print(ResultCache().info())
@@ -1,19 +1,88 @@
 """This module saves the cam file with the blocks that were generated by the
 block_generator module."""
 
-def save_cam(blocks, cam_file):
+import os
+import tempfile
+from pathlib import Path
+
+from camfixer.stage_metrics import NO_METRICS
+
+# Size of the write buffer, so the blocks reach the disk in a few large writes.
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+def _new_file_mode(cam_file: Path) -> int:
+    """The permissions of the atomic output: those of the file it replaces, or the usual
+    ones of a new file, since mkstemp creates private files."""
+    try:
+        return cam_file.stat().st_mode & 0o7777
+    except FileNotFoundError:
+        pass
+    try:
+        # Linux shows the umask without changing it, which os.umask cannot do.
+        with open("/proc/self/status", encoding="ascii") as status:
+            umask = next(int(line.split()[1], 8) for line in status if line.startswith("Umask:"))
+    except (OSError, StopIteration, ValueError, IndexError):
+        umask = os.umask(0)
+        os.umask(umask)
+    return 0o666 & ~umask
+
+
+def save_cam(
+    blocks, cam_file, atomic=False, buffer_size=WRITE_BUFFER_SIZE, metrics=NO_METRICS
+) -> int:
     """This function saves the cam file with the blocks that were generated by the
     block_generator module.
+    The blocks are consumed one at a time, so a generator is written while it is still
+    producing blocks and the whole list is never needed.
     Args:
-        blocks (List[Dict]): A list of dictionaries with the data of the blocks.
+        blocks (Iterable[Dict] | CamProgram): The dictionaries with the data of the blocks,
+            or a parsed program whose blocks are formatted from its arrays.
         cam_file (str): The path to the cam file.
+        atomic (bool): Write to a temporary file next to cam_file and rename it when it is
+            complete, so cam_file is never left half written.
+        buffer_size (int): The size in bytes of the write buffer.
+        metrics (StageMetrics): Records the time of the write stage and the bytes written.
+    Returns:
+        int: The number of blocks written.
     """
-    with open(cam_file, "w", encoding="utf-8") as file:
-        # Writes the start of file.
-        file.write("BOF\n")
-        file.write("G90\n")
-        for block in blocks:
-            file.write(block["text"] + "\n")
-        # Writes the end of file.
-        file.write("M02\n")
-        file.write("EOF\n")
\ No newline at end of file
+    # A CamProgram formats its own blocks; it is not imported here so numpy is not loaded.
+    if hasattr(blocks, "iter_text"):
+        texts = blocks.iter_text()
+    else:
+        texts = (block["text"] for block in blocks)
+
+    cam_file = Path(cam_file)
+    if atomic:
+        descriptor, temp_file = tempfile.mkstemp(
+            dir=cam_file.parent, prefix=f".{cam_file.name}.", suffix=".tmp"
+        )
+        os.close(descriptor)
+        target = Path(temp_file)
+    else:
+        target = cam_file
+
+    num_blocks = 0
+    try:
+        # The blocks are produced while they are written; the time spent producing them
+        # goes to their own stages, not to the write stage.
+        with metrics.stage("write"):
+            if atomic:
+                os.chmod(target, _new_file_mode(cam_file))
+            with open(target, "w", encoding="utf-8", buffering=buffer_size) as file:
+                # Writes the start of file.
+                file.write("BOF\nG90\n")
+                for text in texts:
+                    file.write(text + "\n")
+                    num_blocks += 1
+                # Writes the end of file.
+                file.write("M02\nEOF\n")
+            if atomic:
+                os.replace(target, cam_file)
+            metrics.count("bytes_written", cam_file.stat().st_size)
+    except BaseException:
+        if atomic:
+            target.unlink(missing_ok=True)
+        raise
+
+    return num_blocks
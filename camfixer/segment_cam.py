@@ -0,0 +1,96 @@
+"""This module splits the lines of a cam file into blocks while it reads them."""
+
+import re
+from collections import deque
+from typing import Dict, Iterable, Iterator, List
+
+# A motion line: the code G00 to G03, the end point and the optional arc center.
+MOTION_PATTERN = re.compile(
+    r"G0([0123])X([+-]?\d+\.\d+)Y([+-]?\d+\.\d+)(?:I([+-]?\d+\.\d+))?(?:J([+-]?\d+\.\d+))?"
+)
+
+# States of the segmenter.
+OUTSIDE = 0
+ARC = 1
+MAIN = 2
+END = 3
+
+
+def segment_cam(file: Iterable[str]) -> Iterator[Dict[str, List[str]]]:
+    """This generator yields the lines of each block of a cam file as soon as the block is closed.
+    Only the last two lines before a "M04" and the block being built are kept in memory,
+    so the file handle can be read line by line no matter how large the program is.
+    Empty lines are ignored.
+
+    A block is opened by "M04": the two previous lines are the initial coordinate and the
+    start, and the next two lines are the arc. Every line after the arc is part of the
+    main path until a "M03" followed by a "G40" closes the block.
+
+    Args:
+        file (Iterable[str]): The lines of the cam file, e.g. an open file handle.
+    Yields:
+        Dict[str, List[str]]: The "initial", "start", "arc", "main" and "end" lines of the block.
+    """
+    previous = deque(maxlen=2)
+    state = OUTSIDE
+    block = None
+
+    for line in file:
+        line = line.rstrip("\n")
+        if not line:
+            continue
+
+        if line == "M04":
+            # A new block starts, even if the previous one was never closed.
+            block = {
+                "initial": list(previous)[:-1],
+                "start": list(previous)[-1:] + [line],
+                "arc": [],
+                "main": [],
+                "end": [],
+            }
+            state = ARC
+        elif state == ARC:
+            block["arc"].append(line)
+            if len(block["arc"]) == 2:
+                state = MAIN
+        elif state == MAIN:
+            if line == "M03":
+                state = END
+            else:
+                block["main"].append(line)
+        elif state == END:
+            if line == "G40":
+                block["end"] = ["M03", line]
+                yield block
+                block = None
+                state = OUTSIDE
+            elif line == "M03":
+                block["main"].append("M03")
+            else:
+                # The "M03" was not followed by "G40", so it belongs to the main path.
+                block["main"].extend(["M03", line])
+                state = MAIN
+
+        previous.append(line)
+
+
+if __name__ == "__main__":
+    lines = [
+        "BOF",
+        "G90",
+        "G00X+264.2Y-23.4",
+        "G41",
+        "M04",
+        "G01X+258.5Y-29.0",
+        "G03X+269.8Y-29.0I+264.2J-23.4",
+        "G01X+269.8Y-29.0",
+        "G01X+263.6Y-35.2",
+        "G01X+258.5Y-29.0",
+        "M03",
+        "G40",
+        "M02",
+        "EOF",
+    ]
+    for block in segment_cam(lines):
+        print(block)
@@ -0,0 +1,295 @@
+"""This module serves the fixer over HTTP on the local machine, with a pool of warm worker processes."""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+from camfixer.fix_cam_batch import _fix_one, _init_worker
+from camfixer.result_cache import ResultCache
+from camfixer.tessellate_path import CHORD_TOLERANCE
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Number of latest requests whose latency is kept for the percentiles.
+LATENCY_WINDOW = 10000
+# Size in bytes of the pieces in which the programs are received and sent back.
+STREAM_CHUNK = 1024 * 1024
+
+
+def _percentile(values, percent: float) -> float:
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+@dataclass
+class ServiceMetrics:
+    """The counters of the service since it started, shared by the request threads.
+
+    Attributes:
+        started (float): The perf_counter when the service started.
+        requests (int): The programs fixed.
+        failed (int): The requests that failed.
+        blocks (int): The blocks of the programs fixed.
+        bytes (int): The bytes of the programs received.
+        in_flight (int): The requests being fixed now.
+        latencies (deque): The seconds of the latest LATENCY_WINDOW requests.
+    """
+
+    started: float = field(default_factory=time.perf_counter)
+    requests: int = 0
+    failed: int = 0
+    blocks: int = 0
+    bytes: int = 0
+    in_flight: int = 0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def begin(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def received(self, size: int):
+        with self._lock:
+            self.bytes += size
+
+    def end(self, seconds: float, num_blocks: Optional[int]):
+        """Record a finished request, num_blocks is None if it failed."""
+        with self._lock:
+            self.in_flight -= 1
+            if num_blocks is None:
+                self.failed += 1
+                return
+            self.requests += 1
+            self.blocks += num_blocks
+            self.latencies.append(seconds)
+
+    def to_dict(self) -> Dict:
+        """Get the counters, the latency percentiles in ms and the throughput per second."""
+        with self._lock:
+            latencies = sorted(self.latencies)
+            uptime = time.perf_counter() - self.started
+            return {
+                "requests": self.requests,
+                "failed": self.failed,
+                "in_flight": self.in_flight,
+                "blocks": self.blocks,
+                "bytes": self.bytes,
+                "uptime_seconds": uptime,
+                "latency_ms": {
+                    name: _percentile(latencies, percent) * 1000
+                    for name, percent in (("p50", 50), ("p90", 90), ("p99", 99), ("max", 100))
+                },
+                "requests_per_second": self.requests / uptime if uptime else 0.0,
+                "blocks_per_second": self.blocks / uptime if uptime else 0.0,
+                "megabytes_per_second": self.bytes / 1e6 / uptime if uptime else 0.0,
+            }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """POST /fix fixes the program of the body and sends it back, GET /metrics sends the metrics.
+    The body may be sent with a Content-Length or with Transfer-Encoding: chunked."""
+
+    server: "CamServer"
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/metrics":
+            self.send_error(404)
+            return
+        body = json.dumps(self.server.metrics.to_dict()).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/fix":
+            self.send_error(404)
+            return
+        chunked = self.headers.get("Transfer-Encoding", "").lower() == "chunked"
+        size = None
+        if not chunked:
+            try:
+                size = int(self.headers["Content-Length"])
+            except (TypeError, ValueError):
+                size = -1
+            if size < 0:
+                self.send_error(400, "Se necesita un Content-Length valido o Transfer-Encoding: chunked")
+                return
+        try:
+            tolerance = float(parse_qs(url.query).get("tolerance", [self.server.tolerance])[0])
+        except ValueError:
+            tolerance = float("nan")
+        # NaN is not greater than zero either.
+        if not tolerance > 0:
+            self.send_error(400, "La tolerancia tiene que ser un numero mayor que cero")
+            return
+
+        start = time.perf_counter()
+        self.server.metrics.begin()
+        num_blocks = None
+        with tempfile.TemporaryDirectory(prefix="camfixer-") as directory:
+            input_filepath = Path(directory) / "input.cam"
+            output_filepath = Path(directory) / "output.cam"
+            try:
+                # The body goes to disk in pieces, like the programs of the other modes.
+                with open(input_filepath, "wb") as file:
+                    if chunked:
+                        self._read_chunked(file)
+                    else:
+                        self._read_exactly(file, size)
+            except ValueError as error:
+                self.server.metrics.end(time.perf_counter() - start, None)
+                # The rest of the body may not have been read.
+                self.close_connection = True
+                self.send_error(400, f"Cuerpo del pedido no valido: {error}")
+                return
+            except Exception as error:
+                self.server.metrics.end(time.perf_counter() - start, None)
+                self.close_connection = True
+                self.send_error(500, f"Error al recibir el programa: {error}")
+                return
+            try:
+                self.server.metrics.received(input_filepath.stat().st_size)
+                future = self.server.pool.submit(
+                    _fix_one,
+                    input_filepath,
+                    output_filepath,
+                    tolerance,
+                    False,
+                    self.server.cache,
+                    self.server.optimize_order,
+                    self.server.decimals,
+                )
+                num_blocks, _ = future.result()
+            except Exception as error:
+                self.server.metrics.end(time.perf_counter() - start, None)
+                self.send_error(500, f"Error al procesar el programa: {error}")
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Content-Length", str(output_filepath.stat().st_size))
+            self.send_header("X-Blocks", str(num_blocks))
+            self.end_headers()
+            with open(output_filepath, "rb") as file:
+                shutil.copyfileobj(file, self.wfile, STREAM_CHUNK)
+        self.server.metrics.end(time.perf_counter() - start, num_blocks)
+
+    def _read_exactly(self, file, size: int):
+        while size:
+            chunk = self.rfile.read(min(size, STREAM_CHUNK))
+            if not chunk:
+                raise ValueError("el cuerpo del pedido termino antes de tiempo")
+            file.write(chunk)
+            size -= len(chunk)
+
+    def _read_chunked(self, file):
+        """Copy a body sent with Transfer-Encoding: chunked."""
+        while True:
+            line = self.rfile.readline()
+            try:
+                size = int(line.split(b";")[0], 16)
+            except ValueError:
+                raise ValueError(f"tamano de trozo no valido {line[:32]!r}") from None
+            if size < 0:
+                raise ValueError(f"tamano de trozo no valido {line[:32]!r}")
+            if size == 0:
+                # The trailers end with an empty line.
+                while self.rfile.readline().strip():
+                    pass
+                return
+            self._read_exactly(file, size)
+            self.rfile.readline()
+
+    def log_message(self, format, *args):
+        # The fixer already prints a lot, one line per request is not needed.
+        pass
+
+
+class CamServer(ThreadingHTTPServer):
+    """The HTTP server of the fixer; each request runs in a thread and is fixed in the pool.
+
+    Attributes:
+        pool (ProcessPoolExecutor): The warm worker processes.
+        tolerance (float): The default tolerance of the requests.
+        cache (Optional[ResultCache]): The cache of fixed files shared by the workers.
+        decimals (Optional[int]): The decimals of the fixed-point mode, None for floats.
+        optimize_order (bool): Reorder the blocks of the programs to shorten the rapid moves.
+        metrics (ServiceMetrics): The counters of the service.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self, address, pool, tolerance=CHORD_TOLERANCE, cache=None, decimals=None, optimize_order=False
+    ):
+        super().__init__(address, _Handler)
+        self.pool = pool
+        self.tolerance = tolerance
+        self.cache = cache
+        self.decimals = decimals
+        self.optimize_order = optimize_order
+        self.metrics = ServiceMetrics()
+
+
+def serve_cam(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    workers: int = None,
+    tolerance: float = CHORD_TOLERANCE,
+    cache: Optional[ResultCache] = None,
+    on_ready: Optional[Callable[[CamServer], None]] = None,
+    decimals: Optional[int] = None,
+    optimize_order: bool = False,
+):
+    """Serve the fixer over HTTP until the server is shut down.
+
+    POST /fix with a program as the body returns the fixed program, streamed from disk,
+    with its number of blocks in the X-Blocks header; ?tolerance= overrides the tolerance
+    of the server. A tolerance that is not a positive number, a missing or negative
+    Content-Length and a malformed chunked body are answered with a 400.
+    GET /metrics returns the counters of the service, the p50, p90, p99 and max latency
+    of the latest requests in ms, and the throughput per second.
+
+    The requests are read and answered by threads and fixed by a pool of worker
+    processes, started and warmed up before the first request, so at most `workers`
+    programs are fixed at a time and the others wait for a worker.
+
+    Args:
+        host (str): The address to listen on, the local machine by default.
+        port (int): The port to listen on, 0 for any free port.
+        workers (int): The number of worker processes, by default one per CPU.
+        tolerance (float): The maximum distance between the arcs and the chords of the polygons.
+        cache (Optional[ResultCache]): The cache of fixed files shared by the workers.
+        on_ready (Optional[Callable[[CamServer], None]]): Called with the server once it
+            listens, e.g. to read its port or to call its shutdown from another thread.
+        decimals (Optional[int]): Fix the programs in fixed point with these decimals, see fix_cam.
+        optimize_order (bool): Reorder the blocks of each program to shorten the rapid moves.
+    """
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        # Starts every worker now, so the first requests do not wait for the imports.
+        list(pool.map(time.sleep, [0.01] * workers))
+        with CamServer((host, port), pool, tolerance, cache, decimals, optimize_order) as server:
+            print(f"Sirviendo en http://{host}:{server.server_address[1]} ({workers} procesos)...")
+            if on_ready is not None:
+                on_ready(server)
+            server.serve_forever()
+
+
+if __name__ == "__main__":
+    serve_cam()
@@ -0,0 +1,163 @@
+"""This module records the time, the calls and the counters of each stage of the fixer."""
+
+import json
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows has no resource module, the peak memory is not reported.
+    resource = None
+
+# The stages of the fixer, in the order they run.
+STAGES = ("cache", "check", "read", "segment", "incremental", "parse", "polygons", "containment", "lead_ins", "collisions", "cut_order", "write")
+
+_DONE = object()
+
+
+def _peak_memory_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+@dataclass
+class StageMetrics:
+    """The wall time, number of calls and counters of each stage of one run of the fixer.
+
+    The stages nest: while a stage runs inside another one (e.g. the writer pulling the
+    next fixed block), the time goes to the inner stage only, so the times of all the
+    stages add up to the time of the run. A disabled instance records nothing and costs
+    nothing, it is the default of the functions that accept metrics.
+
+    Attributes:
+        enabled (bool): If False every method is a no-op.
+        seconds (Dict[str, float]): The time spent in each stage.
+        calls (Dict[str, int]): The number of times each stage was entered.
+        counters (Dict[str, int]): Other counts, e.g. "blocks" and "blocks_modified".
+    """
+
+    enabled: bool = True
+    seconds: Dict[str, float] = field(default_factory=dict)
+    calls: Dict[str, int] = field(default_factory=dict)
+    counters: Dict[str, int] = field(default_factory=dict)
+    started: float = field(default_factory=time.perf_counter)
+    stopped: Optional[float] = None
+    merged_peak_memory_mb: Optional[float] = None
+    _stack: List[str] = field(default_factory=list, repr=False)
+    _mark: float = 0.0
+
+    def _enter(self, name: str):
+        now = time.perf_counter()
+        if self._stack:
+            # Pauses the stage that is running.
+            outer = self._stack[-1]
+            self.seconds[outer] = self.seconds.get(outer, 0.0) + now - self._mark
+        self._stack.append(name)
+        self._mark = now
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _exit(self):
+        now = time.perf_counter()
+        name = self._stack.pop()
+        self.seconds[name] = self.seconds.get(name, 0.0) + now - self._mark
+        self._mark = now
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the code of the with block as the stage `name`."""
+        if not self.enabled:
+            yield
+            return
+        self._enter(name)
+        try:
+            yield
+        finally:
+            self._exit()
+
+    def timed(self, name: str, iterable: Iterable) -> Iterator:
+        """This generator yields the items of an iterable, timing each step as the stage `name`.
+        Only the time to produce each item is counted, not the time of the consumer.
+        """
+        if not self.enabled:
+            yield from iterable
+            return
+        iterator = iter(iterable)
+        while True:
+            self._enter(name)
+            try:
+                item = next(iterator, _DONE)
+            finally:
+                self._exit()
+            if item is _DONE:
+                return
+            yield item
+
+    def count(self, name: str, value: int = 1):
+        """Add value to the counter `name`."""
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def stop(self):
+        """Mark the end of the run, the wall time does not grow after it."""
+        if self.enabled and self.stopped is None:
+            self.stopped = time.perf_counter()
+
+    def merge(self, data: Dict):
+        """Add the metrics of another run, as returned by to_dict, e.g. from a worker process."""
+        for name, stage in data["stages"].items():
+            self.seconds[name] = self.seconds.get(name, 0.0) + stage["seconds"]
+            self.calls[name] = self.calls.get(name, 0) + stage["calls"]
+        for name, value in data["counters"].items():
+            self.count(name, value)
+        if data["peak_memory_mb"] is not None:
+            self.merged_peak_memory_mb = max(self.merged_peak_memory_mb or 0.0, data["peak_memory_mb"])
+
+    def to_dict(self) -> Dict:
+        """Get the metrics as a dictionary that can be saved as JSON.
+
+        Returns:
+            Dict: "stages" with the "seconds" and "calls" of each stage, "counters", the
+            wall "seconds" of the run, "blocks_per_second" and "peak_memory_mb".
+        """
+        wall = (self.stopped or time.perf_counter()) - self.started
+        names = [name for name in STAGES if name in self.calls]
+        names += [name for name in self.calls if name not in STAGES]
+        peak_memory_mb = _peak_memory_mb()
+        if self.merged_peak_memory_mb is not None:
+            peak_memory_mb = max(peak_memory_mb or 0.0, self.merged_peak_memory_mb)
+        return {
+            "stages": {
+                name: {"seconds": self.seconds.get(name, 0.0), "calls": self.calls[name]}
+                for name in names
+            },
+            "counters": dict(self.counters),
+            "seconds": wall,
+            "blocks_per_second": self.counters.get("blocks", 0) / wall if wall else 0.0,
+            "peak_memory_mb": peak_memory_mb,
+        }
+
+    def save(self, metrics_file):
+        """Write the metrics to a JSON file."""
+        with open(metrics_file, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, indent=2)
+            file.write("\n")
+
+
+# The default of the functions that accept metrics: records nothing.
+NO_METRICS = StageMetrics(enabled=False)
+
+
+if __name__ == "__main__":
+    metrics = StageMetrics()
+    with metrics.stage("parse"):
+        with metrics.stage("polygons"):
+            time.sleep(0.01)
+    metrics.count("blocks", 10)
+    metrics.stop()
+    print(json.dumps(metrics.to_dict(), indent=2))
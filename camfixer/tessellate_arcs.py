@@ -0,0 +1,148 @@
+"""This module turns the G02/G03 arcs of the main paths into polygon points within a chord tolerance."""
+
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+
+from camfixer.cam_program import CamProgram
+from camfixer.tessellate_path import CHORD_TOLERANCE, count_chords
+
+
+@lru_cache(maxsize=4096)
+def _unit_arc(radius: float, sweep: float, tolerance: float) -> np.ndarray:
+    """Get the inner points of an arc of the unit circle that starts at angle 0.
+
+    The number of chords is the smallest that keeps the sagitta of each chord of the
+    real arc (of the given radius) under the tolerance. The end point is not included.
+    Identical holes share the same (radius, sweep, tolerance) and reuse the result.
+
+    Args:
+        radius (float): The radius of the real arc.
+        sweep (float): The signed angle of the arc in radians, positive counterclockwise.
+        tolerance (float): The maximum sagitta of a chord.
+    Returns:
+        np.ndarray: An (n - 1, 2) array with the cosine and sine of the inner points.
+    """
+    n_chords = count_chords(radius, sweep, tolerance)
+    angles = sweep * np.arange(1, n_chords) / n_chords
+    points = np.column_stack((np.cos(angles), np.sin(angles)))
+    points.flags.writeable = False
+    return points
+
+
+def tessellate_arcs(
+    program: CamProgram, tolerance: float = CHORD_TOLERANCE
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Get the polygon points of the main path of every block, with the arcs tessellated.
+
+    G00/G01 rows add their end point. G02 (clockwise) and G03 (counterclockwise) rows add
+    the inner points of the arc from the previous point to their end point around the
+    center (I, J), and then the end point. An arc that ends where it starts is a full circle.
+
+    Args:
+        program (CamProgram): The parsed cam program.
+        tolerance (float): The maximum distance between an arc and its chords.
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The (m, 2) polygon points of all the blocks and the
+        first point of each block, plus the total number of points.
+    """
+    n_blocks = program.n_blocks
+    block_ids = np.repeat(np.arange(n_blocks), np.diff(program.offsets))
+    rows = np.arange(program.n_rows)
+    is_motion = program.g >= 0
+    is_main = (rows >= program.main_offsets[block_ids]) & is_motion
+
+    # The start of each motion is the end of the last motion before it.
+    last_motion = np.maximum.accumulate(np.where(is_motion, rows, -1))
+    previous = np.concatenate(([-1], last_motion[:-1]))
+
+    main_rows = rows[is_main]
+    g = program.g[main_rows]
+    end_x = program.x[main_rows]
+    end_y = program.y[main_rows]
+    start = previous[main_rows]
+    has_start = start >= program.offsets[block_ids[main_rows]]
+    start_x = np.where(has_start, program.x[start], np.nan)
+    start_y = np.where(has_start, program.y[start], np.nan)
+    center_x = program.i[main_rows]
+    center_y = program.j[main_rows]
+
+    radius = (
+        np.hypot(start_x - center_x, start_y - center_y)
+        + np.hypot(end_x - center_x, end_y - center_y)
+    ) / 2
+    is_arc = (g >= 2) & (radius > 0)
+    arcs = np.flatnonzero(is_arc)
+
+    start_angle = np.arctan2(start_y[arcs] - center_y[arcs], start_x[arcs] - center_x[arcs])
+    end_angle = np.arctan2(end_y[arcs] - center_y[arcs], end_x[arcs] - center_x[arcs])
+    is_clockwise = g[arcs] == 2
+    sweep = np.where(is_clockwise, start_angle - end_angle, end_angle - start_angle) % (2 * np.pi)
+    sweep[np.isclose(sweep, 0) | np.isclose(sweep, 2 * np.pi)] = 2 * np.pi
+    sweep[is_clockwise] *= -1
+
+    units = [
+        _unit_arc(round(r, 3), round(s, 6), tolerance)
+        for r, s in zip(radius[arcs].tolist(), sweep.tolist())
+    ]
+    extra = np.zeros(len(main_rows), dtype=np.int64)
+    extra[arcs] = [len(unit) for unit in units]
+
+    # Places the inner points of each arc before its end point.
+    counts = extra + 1
+    first = np.cumsum(counts) - counts
+    points = np.empty((int(counts.sum()), 2))
+    points[first + extra, 0] = end_x
+    points[first + extra, 1] = end_y
+    if extra.any():
+        unit = np.concatenate(units)
+        arc_extra = extra[arcs]
+        arc_index = np.repeat(np.arange(len(arcs)), arc_extra)
+        owner = arcs[arc_index]
+        inner = np.arange(len(unit)) - (np.cumsum(arc_extra) - arc_extra)[arc_index]
+        position = first[owner] + inner
+        # Rotates the unit points to the start angle, then scales and moves them to the arc.
+        cos_a = np.cos(start_angle)[arc_index]
+        sin_a = np.sin(start_angle)[arc_index]
+        scale = radius[owner]
+        points[position, 0] = center_x[owner] + scale * (cos_a * unit[:, 0] - sin_a * unit[:, 1])
+        points[position, 1] = center_y[owner] + scale * (sin_a * unit[:, 0] + cos_a * unit[:, 1])
+
+    offsets = np.zeros(n_blocks + 1, dtype=np.int64)
+    points_per_block = np.bincount(block_ids[main_rows], weights=counts, minlength=n_blocks)
+    offsets[1:] = np.cumsum(points_per_block.astype(np.int64))
+    return points, offsets
+
+
+def get_is_circle(program: CamProgram) -> np.ndarray:
+    """Find the blocks whose main path is a circle: only G02/G03 arcs around one center.
+
+    Args:
+        program (CamProgram): The parsed cam program.
+    Returns:
+        np.ndarray: A boolean for each block.
+    """
+    n_blocks = program.n_blocks
+    block_ids = np.repeat(np.arange(n_blocks), np.diff(program.offsets))
+    rows = np.arange(program.n_rows)
+    main_rows = rows[(rows >= program.main_offsets[block_ids]) & (program.g >= 0)]
+    ids = block_ids[main_rows]
+
+    counts = np.bincount(ids, minlength=n_blocks)
+    # The center of the first motion of each main path.
+    first = np.full(n_blocks, -1)
+    first[ids[::-1]] = main_rows[::-1]
+    same_center = (program.i[main_rows] == program.i[first[ids]]) & (
+        program.j[main_rows] == program.j[first[ids]]
+    )
+    is_round = (program.g[main_rows] >= 2) & same_center
+    return (counts > 0) & (np.bincount(ids, weights=is_round, minlength=n_blocks) == counts)
+
+
+if __name__ == "__main__":
+    from camfixer.cam_program import read_cam_program
+
+    program = read_cam_program("archivo.cam")
+    points, offsets = tessellate_arcs(program)
+    print(f"{program.n_blocks} bloques, {len(points)} puntos")
@@ -0,0 +1,103 @@
+"""This module turns the motion lines of one block into polygon points with plain Python.
+
+It is the lightweight counterpart of tessellate_arcs: it needs neither numpy nor shapely,
+so a cam file can be checked without loading them.
+"""
+
+import math
+from typing import List, Optional, Tuple
+
+from camfixer.segment_cam import MOTION_PATTERN
+
+# Maximum distance between an arc and the chords that replace it, in mm.
+CHORD_TOLERANCE = 0.05
+
+Coordinate = Tuple[float, float]
+
+
+def count_chords(radius: float, sweep: float, tolerance: float) -> int:
+    """Get the smallest number of chords that keeps the sagitta of each one under the tolerance.
+
+    Args:
+        radius (float): The radius of the arc.
+        sweep (float): The signed angle of the arc in radians.
+        tolerance (float): The maximum sagitta of a chord, positive.
+    Returns:
+        int: The number of chords, at least 1.
+    Raises:
+        ValueError: If the tolerance is not positive.
+    """
+    if not tolerance > 0:
+        raise ValueError(f"La tolerancia tiene que ser positiva: {tolerance}")
+    if tolerance >= 2 * radius:
+        # Any chord is within the tolerance, and acos is not defined past 2 * radius.
+        max_angle = math.pi
+    else:
+        # Past radius the angle is over half a turn; the chords are kept to half a turn,
+        # as they always were, so the points of a large tolerance do not change.
+        max_angle = min(2 * math.acos(1 - tolerance / radius), math.pi)
+    return max(1, math.ceil(abs(sweep) / max_angle))
+
+
+def tessellate_path(
+    lines: List[str], start: Optional[Coordinate] = None, tolerance: float = CHORD_TOLERANCE
+) -> List[Coordinate]:
+    """Get the polygon points of a main path, with the G02/G03 arcs tessellated.
+
+    The points are the same that tessellate_arcs gives for the block: G00/G01 lines add
+    their end point, G02 (clockwise) and G03 (counterclockwise) lines add the inner points
+    of the arc around the center (I, J) and then their end point. An arc that ends where
+    it starts is a full circle.
+
+    Args:
+        lines (List[str]): The lines of the main path.
+        start (Optional[Coordinate]): The point before the path, the end of the lead-in arc.
+        tolerance (float): The maximum distance between an arc and its chords.
+    Returns:
+        List[Coordinate]: The (x, y) points of the polygon.
+    """
+    points = []
+    previous = start
+    for line in lines:
+        match = MOTION_PATTERN.search(line)
+        if not match:
+            continue
+        g, x, y, i, j = match.groups()
+        x, y = float(x), float(y)
+        if g in "23" and previous is not None and i is not None and j is not None:
+            center_x, center_y = float(i), float(j)
+            start_x, start_y = previous
+            radius = (
+                math.hypot(start_x - center_x, start_y - center_y)
+                + math.hypot(x - center_x, y - center_y)
+            ) / 2
+            if radius > 0:
+                start_angle = math.atan2(start_y - center_y, start_x - center_x)
+                end_angle = math.atan2(y - center_y, x - center_x)
+                if g == "2":
+                    sweep = (start_angle - end_angle) % (2 * math.pi)
+                else:
+                    sweep = (end_angle - start_angle) % (2 * math.pi)
+                # Same closeness as numpy.isclose in tessellate_arcs.
+                if sweep <= 1e-8 or abs(sweep - 2 * math.pi) <= 1e-8 + 1e-5 * 2 * math.pi:
+                    sweep = 2 * math.pi
+                if g == "2":
+                    sweep = -sweep
+                # The sweep is rounded like the cache key of tessellate_arcs.
+                sweep = round(sweep, 6)
+                n_chords = count_chords(round(radius, 3), sweep, tolerance)
+                for chord in range(1, n_chords):
+                    angle = start_angle + sweep * chord / n_chords
+                    points.append(
+                        (center_x + radius * math.cos(angle), center_y + radius * math.sin(angle))
+                    )
+        points.append((x, y))
+        previous = (x, y)
+    return points
+
+
+if __name__ == "__main__":
+    circle = [
+        "G03X+10.0Y+0.0I+0.0J+0.0",
+    ]
+    print(len(tessellate_path(circle, start=(10.0, 0.0))))
@@ -0,0 +1,82 @@
+"""This module parses the motion lines of a cam file into numeric arrays in a single pass."""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from camfixer.fixed_point import MISSING, parse_fixed
+from camfixer.segment_cam import MOTION_PATTERN
+
+
+def tokenize_cam(lines: List[str], decimals: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """Parse the motion lines of a cam file into numeric arrays.
+
+    The lines are joined and scanned once with the compiled pattern, and all the
+    captured numbers are converted with a single call. Each match is assigned to its
+    line with a search over the line offsets, so every line is parsed exactly once and
+    lines without a motion get an empty row.
+
+    Args:
+        lines (List[str]): The lines of a cam file, without empty lines.
+        decimals (Optional[int]): If given, the coordinates are read as int64 units of
+            10**-decimals mm with parse_fixed instead of floats.
+    Returns:
+        Dict[str, np.ndarray]: The arrays "g", "x", "y", "i" and "j", one row per line.
+        "g" is the motion code (0 to 3) or -1 for lines without a motion, and the missing
+        coordinates are NaN, or MISSING in fixed point. "negative_zero" has the (n, 4)
+        flags of the x, y, i and j written as a negative zero, whose sign the integers
+        of the fixed point lose; the floats keep it, so it is all False for them.
+    """
+    fixed = decimals is not None
+    table = np.full((len(lines), 5), MISSING) if fixed else np.full((len(lines), 5), np.nan)
+    negative_zero = np.zeros((len(lines), 4), dtype=bool)
+    starts = []
+    fields = []
+    for match in MOTION_PATTERN.finditer("\n".join(lines)):
+        starts.append(match.start())
+        fields.extend(match.groups())
+
+    if starts:
+        if fixed:
+            # The motion code is the first field of each match, the coordinates the others.
+            codes = np.array(fields[::5], dtype=np.int64)
+            del fields[::5]
+            coordinates = parse_fixed(fields, decimals)
+            # Only the zeros are looked at again, to keep the sign of a "-0.0".
+            zeros = np.flatnonzero(coordinates == 0)
+            signs = np.zeros(len(coordinates), dtype=bool)
+            signs[zeros] = [fields[index][0] == "-" for index in zeros.tolist()]
+            values = np.column_stack((codes, coordinates.reshape(-1, 4)))
+        else:
+            values = np.array(" ".join(field or "nan" for field in fields).split(), dtype=np.float64)
+        line_ends = np.cumsum([len(line) + 1 for line in lines])
+        rows = np.searchsorted(line_ends, starts, side="right")
+        # Like re.search, only the first motion of a line counts.
+        first = np.append(True, rows[1:] != rows[:-1])
+        table[rows[first]] = values.reshape(-1, 5)[first]
+        if fixed:
+            negative_zero[rows[first]] = signs.reshape(-1, 4)[first]
+
+    codes = table[:, 0]
+    no_motion = codes == MISSING if fixed else np.isnan(codes)
+    return {
+        "g": np.where(no_motion, -1, codes).astype(np.int8),
+        "x": table[:, 1],
+        "y": table[:, 2],
+        "i": table[:, 3],
+        "j": table[:, 4],
+        "negative_zero": negative_zero,
+    }
+
+
+if __name__ == "__main__":
+    lines = [
+        "G00X+264.2Y-23.4",
+        "G41",
+        "M04",
+        "G01X+258.5Y-29.0",
+        "G03X+269.8Y-29.0I+264.2J-23.4",
+    ]
+    tokens = tokenize_cam(lines)
+    print(tokens)
+    # Output: g = [0, -1, -1, 1, 3], i = [nan, nan, nan, nan, 264.2]
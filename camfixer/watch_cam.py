@@ -0,0 +1,217 @@
+"""This module watches an inbox directory and fixes every cam file dropped in it, as a long-running daemon."""
+
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+from camfixer.fix_cam_batch import _fix_one, _init_worker
+from camfixer.result_cache import ResultCache
+from camfixer.tessellate_path import CHORD_TOLERANCE
+
+# Seconds between two scans of the inbox when inotify is not available.
+POLL_INTERVAL = 0.1
+# Files waiting for a worker; above it the inbox is not scanned, the files wait on disk.
+MAX_QUEUE = 64
+# Subdirectories of the inbox where the input files are moved once processed.
+DONE_DIR = "procesados"
+FAILED_DIR = "errores"
+
+# inotify events of a file that was closed after writing or moved into the directory.
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_EVENT = struct.Struct("iIII")
+
+
+def _inotify(directory: Path) -> Optional[int]:
+    """Get an inotify descriptor watching the directory, or None where inotify is not available."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        descriptor = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError, TypeError):
+        return None
+    if descriptor < 0:
+        return None
+    if libc.inotify_add_watch(descriptor, os.fsencode(directory), _IN_CLOSE_WRITE | _IN_MOVED_TO) < 0:
+        os.close(descriptor)
+        return None
+    return descriptor
+
+
+def _read_events(descriptor: int) -> Set[str]:
+    """Get the names of the files of the pending inotify events."""
+    names = set()
+    while True:
+        try:
+            data = os.read(descriptor, 64 * 1024)
+        except BlockingIOError:
+            return names
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            names.add(os.fsdecode(data[offset : offset + length].rstrip(b"\0")))
+            offset += length
+
+
+def _scan(inbox: Path) -> Dict[str, Tuple[int, int]]:
+    """Get the size and modification time of the cam files of the inbox, hidden files aside."""
+    files = {}
+    with os.scandir(inbox) as entries:
+        for entry in entries:
+            if entry.name.startswith(".") or not entry.name.lower().endswith(".cam"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if entry.is_file():
+                files[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def _move(path: Path, directory: Path):
+    """Move a file into a directory, replacing a file with the same name.
+
+    A file that cannot be moved, e.g. because it was removed while it was fixed, is
+    reported and left where it is.
+    """
+    try:
+        directory.mkdir(exist_ok=True)
+        os.replace(path, directory / path.name)
+    except OSError as error:
+        print(f"No se pudo mover {path.name} a {directory.name}: {error}")
+
+
+async def watch_cam(
+    inbox,
+    outbox,
+    workers: int = None,
+    tolerance: float = CHORD_TOLERANCE,
+    cache: Optional[ResultCache] = None,
+    poll_interval: float = POLL_INTERVAL,
+    max_queue: int = MAX_QUEUE,
+    stop: Optional[asyncio.Event] = None,
+    decimals: Optional[int] = None,
+    optimize_order: bool = False,
+):
+    """Fix every cam file that is dropped in the inbox, until stop is set.
+
+    The inbox is watched with inotify where it is available, and scanned every
+    poll_interval seconds in any case. A file named by inotify is ready, it was closed
+    after writing or moved in; a file found by a scan is ready once its size and time
+    did not change since the previous scan, so a file that is still being copied waits.
+
+    The ready files go to a queue of max_queue files read by a pool of worker
+    processes, started and warmed up once, so no process is started per file. When the
+    queue is full the inbox is not scanned until a worker takes a file: the files wait
+    in the inbox. The fixed file is written to the outbox with a rename, so the machine
+    never reads it half written, and the input is then moved to the DONE_DIR or, if it
+    failed, the FAILED_DIR subdirectory of the inbox.
+
+    Args:
+        inbox (str): The directory where the cam files are dropped.
+        outbox (str): The directory where the fixed cam files are saved.
+        workers (int): The number of worker processes, by default one per CPU.
+        tolerance (float): The maximum distance between the arcs and the chords of the polygons.
+        cache (Optional[ResultCache]): The cache of fixed files shared by the workers.
+        poll_interval (float): The seconds between two scans of the inbox.
+        max_queue (int): The maximum number of files waiting for a worker.
+        stop (Optional[asyncio.Event]): Stops the daemon when it is set, after the
+            files being fixed are done.
+        decimals (Optional[int]): Fix the files in fixed point with these decimals, see fix_cam.
+        optimize_order (bool): Reorder the blocks of each file to shorten the rapid moves.
+    """
+    inbox, outbox = Path(inbox), Path(outbox)
+    outbox.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    stop = stop or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=max_queue)
+    # The files in the queue or being fixed, they are not queued again.
+    pending = set()
+
+    async def fix_file(pool, name: str, found: float):
+        path = inbox / name
+        try:
+            num_blocks, _ = await loop.run_in_executor(
+                pool, _fix_one, path, outbox / name, tolerance, False, cache, optimize_order, decimals
+            )
+        except Exception as error:
+            print(f"Error al procesar {name}: {error}")
+            _move(path, inbox / FAILED_DIR)
+        else:
+            _move(path, inbox / DONE_DIR)
+            milliseconds = (time.perf_counter() - found) * 1000
+            print(f"{name}: {num_blocks} bloques corregidos en {milliseconds:.0f} ms")
+
+    async def fix(pool):
+        while True:
+            name, found = await queue.get()
+            try:
+                await fix_file(pool, name, found)
+            except Exception as error:
+                # A fixer that ends is a worker lost until the daemon is restarted.
+                print(f"Error inesperado con {name}: {error}")
+            finally:
+                pending.discard(name)
+                queue.task_done()
+
+    changed = asyncio.Event()
+    notified = set()
+    descriptor = _inotify(inbox)
+    if descriptor is not None:
+
+        def on_events():
+            notified.update(_read_events(descriptor))
+            changed.set()
+
+        loop.add_reader(descriptor, on_events)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        # Starts every worker now, so the first files do not wait for the imports.
+        await asyncio.gather(*(loop.run_in_executor(pool, time.sleep, 0.01) for _ in range(workers)))
+        fixers = [asyncio.create_task(fix(pool)) for _ in range(workers)]
+        print(f"Esperando archivos .CAM en {inbox} ({'inotify' if descriptor is not None else 'sondeo'})...")
+
+        # The files of the inbox when the daemon starts are ready.
+        previous = {}
+        ready = set(_scan(inbox))
+        try:
+            while not stop.is_set():
+                files = _scan(inbox)
+                ready.update(notified & files.keys())
+                notified.clear()
+                ready.update(name for name, state in files.items() if previous.get(name) == state)
+                previous = files
+                for name in sorted(ready & files.keys(), key=lambda name: files[name][1]):
+                    if name in pending:
+                        continue
+                    if queue.full():
+                        print("Cola llena, esperando a los procesos...")
+                    pending.add(name)
+                    await queue.put((name, time.perf_counter()))
+                ready.clear()
+
+                # Waits for inotify or for the next scan.
+                changed.clear()
+                waits = [asyncio.ensure_future(changed.wait()), asyncio.ensure_future(stop.wait())]
+                await asyncio.wait(waits, timeout=poll_interval, return_when=asyncio.FIRST_COMPLETED)
+                for wait in waits:
+                    wait.cancel()
+            await queue.join()
+        finally:
+            for fixer in fixers:
+                fixer.cancel()
+            if descriptor is not None:
+                loop.remove_reader(descriptor)
+                os.close(descriptor)
+
+
+if __name__ == "__main__":
+    asyncio.run(watch_cam("entrada", "salida"))
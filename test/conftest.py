@@ -0,0 +1,19 @@
+"""Shared fixtures of the tests: a small synthetic nest with arcs, holes and parts inside holes."""
+
+import pytest
+
+from benchmarks.generate_nest import generate_nest
+
+
+@pytest.fixture(scope="session")
+def nest_lines():
+    """The lines of a nest of about 80 contours, a fixed seed so every run sees the same program."""
+    return list(generate_nest(n_contours=80, holes_per_part=3, arc_density=0.6, nested_density=0.5, seed=3))
+
+
+@pytest.fixture
+def nest_file(tmp_path, nest_lines):
+    """The nest written to a cam file."""
+    cam_file = tmp_path / "nest.cam"
+    cam_file.write_text("\n".join(nest_lines) + "\n", encoding="utf-8")
+    return cam_file
@@ -0,0 +1,82 @@
+"""Tests of the analysis file: save and load give back the same program and blocks."""
+
+from dataclasses import fields
+
+import numpy as np
+import pytest
+
+from camfixer.cam_analysis import CamAnalysis, analyze_cam
+from camfixer.cam_program import CamProgram
+from camfixer.fix_cam import fix_cam, fix_cam_analysis
+from camfixer.is_cam_analysis import is_cam_analysis
+from camfixer.segment_cam import segment_cam
+
+
+def _assert_same(loaded, analysis):
+    assert loaded.tolerance == analysis.tolerance
+    assert loaded.program.decimals == analysis.program.decimals
+    for field in fields(CamProgram):
+        if field.name != "decimals":
+            np.testing.assert_array_equal(getattr(loaded.program, field.name), getattr(analysis.program, field.name))
+    for field in fields(CamAnalysis):
+        if field.name not in ("program", "tolerance"):
+            np.testing.assert_array_equal(getattr(loaded, field.name), getattr(analysis, field.name))
+
+
+def test_save_load_round_trip(tmp_path, nest_file):
+    analysis = analyze_cam(nest_file, tolerance=0.02)
+    analysis.save(tmp_path / "nest.cama")
+    assert is_cam_analysis(tmp_path / "nest.cama")
+    assert not is_cam_analysis(nest_file)
+    with CamAnalysis.load(tmp_path / "nest.cama") as loaded:
+        _assert_same(loaded, analysis)
+
+
+def test_save_load_round_trip_fixed_point(tmp_path, nest_file):
+    analysis = analyze_cam(nest_file, decimals=1)
+    analysis.save(tmp_path / "nest.cama")
+    with CamAnalysis.load(tmp_path / "nest.cama") as loaded:
+        _assert_same(loaded, analysis)
+        assert loaded.program.x.dtype == np.int64
+
+
+def test_blocks_keep_lines_that_are_not_motions(tmp_path, nest_lines):
+    lines = list(nest_lines)
+    second = [index for index, line in enumerate(lines) if line == "M04"][1]
+    lines.insert(second + 3, "(comentario)")
+    lines[second + 4] += "F500"
+    cam_file = tmp_path / "odd.cam"
+    cam_file.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    CamAnalysis.save(analyze_cam(cam_file), tmp_path / "odd.cama")
+    with CamAnalysis.load(tmp_path / "odd.cama") as loaded:
+        for segment, block in zip(segment_cam(lines), loaded.blocks()):
+            assert block.initial + block.start + block.arc + block.main_text.split("\n") + block.end == (
+                segment["initial"] + segment["start"] + segment["arc"] + segment["main"] + segment["end"]
+            )
+        # Only the block with the comment had to be kept as text.
+        assert np.count_nonzero(np.diff(loaded.verbatim_offsets)) == 1
+
+
+def test_close_releases_the_map(tmp_path, nest_file):
+    analyze_cam(nest_file).save(tmp_path / "nest.cama")
+    with CamAnalysis.load(tmp_path / "nest.cama") as loaded:
+        data = loaded._map
+        assert loaded.summary()["blocks"] > 0
+    assert data.closed
+    assert loaded.program is None
+    # Closing again, or an analysis that was not loaded, does nothing.
+    loaded.close()
+    analyze_cam(nest_file).close()
+
+
+def test_load_rejects_other_files(nest_file):
+    with pytest.raises(ValueError):
+        CamAnalysis.load(nest_file)
+
+
+def test_fix_from_analysis_matches_fix_from_text(tmp_path, nest_file):
+    analyze_cam(nest_file).save(tmp_path / "nest.cama")
+    fix_cam_analysis(tmp_path / "nest.cama", tmp_path / "from_analysis.cam", workers=1)
+    fix_cam(nest_file, tmp_path / "from_text.cam", workers=1)
+    assert (tmp_path / "from_analysis.cam").read_bytes() == (tmp_path / "from_text.cam").read_bytes()
@@ -0,0 +1,11 @@
+"""Tests of the memory-mapped block index against the line-by-line segmenter."""
+
+from camfixer.cam_index import CamIndex
+from camfixer.segment_cam import segment_cam
+
+
+def test_cam_index_matches_segment_cam(nest_file):
+    with open(nest_file, "r", encoding="utf-8") as file:
+        segments = list(segment_cam(file))
+    with CamIndex(nest_file) as index:
+        assert list(index.iter_segments()) == segments
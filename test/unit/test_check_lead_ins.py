@@ -0,0 +1,111 @@
+"""Tests of the check of the fixed lead-ins against the contours around them."""
+
+import pytest
+
+from camfixer.block_generator import _block_generator, block_generator
+from camfixer.check_lead_ins import check_lead_ins
+from camfixer.fix_lead_ins import fix_lead_ins
+from camfixer.get_hierarchy import set_hierarchy
+from camfixer.stage_metrics import StageMetrics
+
+# Block 1 is a hole with its lead-in outside; moved inside, it crosses the part 2.
+# Block 4 is the outer part, its lead-in is inside and crosses the hole 3, but
+# fix_lead_ins does not rewrite the lines of outer parts, so it is left as it is.
+PROGRAM = [
+    "BOF",
+    "G90",
+    "G00X+38.0Y+50.0",
+    "G41",
+    "M04",
+    "G01X+38.0Y+52.0",
+    "G03X+40.0Y+50.0I+38.0J+50.0",
+    "G01X+40.0Y+40.0",
+    "G01X+60.0Y+40.0",
+    "G01X+60.0Y+60.0",
+    "G01X+40.0Y+60.0",
+    "G01X+40.0Y+50.0",
+    "M03",
+    "G40",
+    "G00X+45.0Y+50.0",
+    "G41",
+    "M04",
+    "G01X+45.0Y+50.5",
+    "G03X+44.5Y+50.0I+45.0J+50.0",
+    "G01X+44.5Y+48.5",
+    "G01X+42.5Y+48.5",
+    "G01X+42.5Y+51.5",
+    "G01X+44.5Y+51.5",
+    "G01X+44.5Y+50.0",
+    "M03",
+    "G40",
+    "G00X+3.2Y+50.0",
+    "G41",
+    "M04",
+    "G01X+3.2Y+49.7",
+    "G03X+3.5Y+50.0I+3.2J+50.0",
+    "G01X+3.5Y+50.5",
+    "G01X+2.5Y+50.5",
+    "G01X+2.5Y+49.5",
+    "G01X+3.5Y+49.5",
+    "G01X+3.5Y+50.0",
+    "M03",
+    "G40",
+    "G00X+3.0Y+50.0",
+    "G41",
+    "M04",
+    "G01X+3.0Y+53.0",
+    "G03X+0.0Y+50.0I+3.0J+50.0",
+    "G01X+0.0Y+0.0",
+    "G01X+100.0Y+0.0",
+    "G01X+100.0Y+100.0",
+    "G01X+0.0Y+100.0",
+    "G01X+0.0Y+50.0",
+    "M03",
+    "G40",
+    "M02",
+]
+
+
+@pytest.fixture
+def hole_file(tmp_path):
+    cam_file = tmp_path / "hole.cam"
+    cam_file.write_text("\n".join(PROGRAM) + "\n", encoding="utf-8")
+    return cam_file
+
+
+def _checked(cam_file, retries):
+    blocks = list(_block_generator(cam_file))
+    set_hierarchy(blocks)
+    metrics = StageMetrics()
+    return list(check_lead_ins(fix_lead_ins(blocks), blocks, retries=retries, metrics=metrics)), metrics
+
+
+def test_crossing_lead_in_is_shortened(hole_file):
+    blocks, metrics = _checked(hole_file, retries=2)
+    hole = blocks[0]
+    assert hole.lead_in_fixed
+    assert hole.initial == ["G00X+41.0Y+50.0"]
+    assert hole.arc == ["G01X+41.0Y+49.0", "G03X+40.0Y+50.0I+41.0J+50.0"]
+    assert hole.collisions is None
+    assert metrics.counters == {"lead_ins_shortened": 1}
+
+
+def test_crossing_lead_in_is_flagged_without_retries(hole_file):
+    blocks, metrics = _checked(hole_file, retries=0)
+    hole = blocks[0]
+    # The lead-in is put back as fix_lead_ins wrote it.
+    assert hole.initial == ["G00X+42.0Y+50.0"]
+    assert hole.collisions == [2]
+    assert metrics.counters == {"lead_in_collisions": 1}
+
+
+def test_lead_ins_not_rewritten_are_not_checked_or_counted(hole_file):
+    metrics = StageMetrics()
+    blocks = list(block_generator(hole_file, workers=1, metrics=metrics))
+    outer = blocks[3]
+    # A new pierce point was computed for the outer part, but its lines were not rewritten.
+    assert outer.nuevo_ini is not None and not outer.lead_in_fixed
+    assert outer.initial == ["G00X+3.0Y+50.0"]
+    assert outer.arc == ["G01X+3.0Y+53.0", "G03X+0.0Y+50.0I+3.0J+50.0"]
+    assert outer.collisions is None
+    assert metrics.counters["blocks_modified"] == 1
@@ -0,0 +1,39 @@
+"""Tests of fix_cam: the check fast path writes the same file as the full pipeline."""
+
+import pytest
+
+from benchmarks.generate_nest import generate_nest
+from camfixer.fix_cam import fix_cam
+from camfixer.stage_metrics import StageMetrics
+
+
+@pytest.fixture
+def clean_file(tmp_path):
+    """A nest whose lead-ins are all on the right side already."""
+    lines = generate_nest(n_contours=80, holes_per_part=3, arc_density=0.6, wrong_lead_ins=0.0, seed=3)
+    cam_file = tmp_path / "clean.cam"
+    cam_file.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return cam_file
+
+
+def _fix(cam_file, output_filepath, check):
+    metrics = StageMetrics()
+    num_blocks = fix_cam(cam_file, output_filepath, metrics=metrics, check=check, workers=1)
+    return num_blocks, output_filepath.read_bytes(), metrics
+
+
+def test_check_copies_a_clean_file_like_the_fixer(tmp_path, clean_file):
+    checked = _fix(clean_file, tmp_path / "checked.cam", check=True)
+    fixed = _fix(clean_file, tmp_path / "fixed.cam", check=False)
+    assert checked[:2] == fixed[:2]
+    # The fast path was taken: the blocks were copied without being analysed.
+    assert "check" in checked[2].seconds and "lead_ins" not in checked[2].seconds
+    assert "blocks_modified" not in fixed[2].counters
+
+
+def test_check_runs_the_fixer_when_a_lead_in_is_wrong(tmp_path, nest_file):
+    checked = _fix(nest_file, tmp_path / "checked.cam", check=True)
+    fixed = _fix(nest_file, tmp_path / "fixed.cam", check=False)
+    assert checked[:2] == fixed[:2]
+    assert "lead_ins" in checked[2].seconds
+    assert checked[1] != nest_file.read_bytes()
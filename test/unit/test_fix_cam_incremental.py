@@ -0,0 +1,33 @@
+"""Tests of the incremental fix: after any change its output is the output of a full fix."""
+
+from camfixer.fix_cam import fix_cam
+from camfixer.fix_cam_incremental import fix_cam_incremental
+
+
+def _without_block(lines, number):
+    """The lines of the program without its block `number`, counted from 0."""
+    starts = [index - 2 for index, line in enumerate(lines) if line == "M04"]
+    return lines[: starts[number]] + lines[starts[number + 1] :]
+
+
+def test_incremental_fix_matches_full_fix(tmp_path, nest_lines):
+    cam_file, state_file = tmp_path / "nest.cam", tmp_path / "nest.state.json"
+    lines = list(nest_lines)
+    for revision in range(4):
+        cam_file.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        summary = fix_cam_incremental(cam_file, tmp_path / "incremental.cam", state_file)
+        fix_cam(cam_file, tmp_path / "full.cam", workers=1)
+        assert (tmp_path / "incremental.cam").read_bytes() == (tmp_path / "full.cam").read_bytes()
+        if revision:
+            assert summary["reused"] > 0 and summary["removed"] == 1
+        lines = _without_block(lines, 10 * revision + 5)
+
+
+def test_incremental_state_is_kept_per_decimals(tmp_path, nest_file):
+    state_file = tmp_path / "nest.state.json"
+    fix_cam_incremental(nest_file, tmp_path / "float.cam", state_file)
+    summary = fix_cam_incremental(nest_file, tmp_path / "fixed.cam", state_file, decimals=1)
+    assert summary["reused"] == 0
+    summary = fix_cam_incremental(nest_file, tmp_path / "fixed.cam", state_file, decimals=1)
+    assert summary["fixed"] == 0
+    assert (tmp_path / "fixed.cam").read_bytes() == (tmp_path / "float.cam").read_bytes()
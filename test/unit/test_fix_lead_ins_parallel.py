@@ -0,0 +1,35 @@
+"""Tests of the parallel lead-in fixer against the serial one."""
+
+import camfixer.fix_lead_ins_parallel
+from camfixer.block_generator import _block_generator
+from camfixer.fix_lead_ins import fix_lead_ins
+from camfixer.fix_lead_ins_parallel import fix_lead_ins_parallel
+from camfixer.get_hierarchy import set_hierarchy
+
+
+def _blocks(cam_file, decimals=None):
+    blocks = list(_block_generator(cam_file, decimals=decimals))
+    set_hierarchy(blocks)
+    return blocks
+
+
+def _fields(blocks):
+    return [(block.text, block.nuevo_ini and block.nuevo_ini.wkt, block.lead_in_fixed) for block in blocks]
+
+
+def test_parallel_matches_serial(nest_file, monkeypatch, capsys):
+    monkeypatch.setattr(camfixer.fix_lead_ins_parallel, "PARALLEL_MIN_BLOCKS", 0)
+    serial = _fields(fix_lead_ins(_blocks(nest_file)))
+    serial_output = capsys.readouterr().out
+    # Small chunks, so the blocks are spread over several workers and put back in order.
+    parallel = _fields(fix_lead_ins_parallel(_blocks(nest_file), workers=2, chunk_size=7))
+    assert parallel == serial
+    assert capsys.readouterr().out == serial_output
+    assert any(fixed for _, _, fixed in serial)
+
+
+def test_parallel_matches_serial_fixed_point(nest_file, monkeypatch):
+    monkeypatch.setattr(camfixer.fix_lead_ins_parallel, "PARALLEL_MIN_BLOCKS", 0)
+    serial = _fields(fix_lead_ins(_blocks(nest_file, decimals=1), decimals=1))
+    parallel = _fields(fix_lead_ins_parallel(_blocks(nest_file, decimals=1), workers=2, chunk_size=7, decimals=1))
+    assert parallel == serial
@@ -0,0 +1,85 @@
+"""Tests of the fixed-point coordinates: exact round trips and the rejected inputs."""
+
+import numpy as np
+import pytest
+
+from camfixer.cam_program import read_cam_program
+from camfixer.fix_cam import fix_cam
+from camfixer.fixed_point import MISSING, format_coordinate, format_fixed, parse_fixed, to_fixed, to_float
+
+
+def test_parse_format_round_trip():
+    fields = ["+1928.2", "-0.5", None, "+0.0", "-1089.5", "+12.0"]
+    values = parse_fixed(fields)
+    assert values.tolist() == [19282, -5, MISSING, 0, -10895, 120]
+    assert [format_fixed(value) for value in values.tolist() if value != MISSING] == [
+        "+1928.2",
+        "-0.5",
+        "+0.0",
+        "-1089.5",
+        "+12.0",
+    ]
+    assert format_fixed(int(parse_fixed(["-0.05"], 2)[0]), 2) == "-0.05"
+
+
+def test_to_float_is_the_parsed_float():
+    values = parse_fixed(["+1928.2", "-0.3", None])
+    result = to_float(values)
+    assert result[:2].tolist() == [1928.2, -0.3]
+    assert np.isnan(result[2])
+
+
+def test_to_fixed_rounds_halves_away_from_zero():
+    assert to_fixed([1.25, -1.25, 1.24, 2.675], 1).tolist() == [13, -13, 12, 27]
+    assert format_coordinate(1.25, 1) == "+1.3"
+    assert format_coordinate(-1.25, 2) == "-1.25"
+
+
+@pytest.mark.parametrize("field", ["+1.2.3", "+1.25", "+1", "1.2 3.4", "+1.2x", ".5", " "])
+def test_parse_fixed_rejects_malformed_numbers(field):
+    with pytest.raises(ValueError):
+        parse_fixed(["+1.0", field])
+
+
+@pytest.mark.parametrize("decimals", [0, -1])
+def test_parse_fixed_rejects_decimals_below_one(decimals):
+    with pytest.raises(ValueError):
+        parse_fixed(["+1.0"], decimals)
+
+
+def test_program_text_round_trip(nest_file):
+    program = read_cam_program(nest_file, decimals=1)
+    assert program.x.dtype == np.int64
+    lines = [line for line in nest_file.read_text(encoding="utf-8").split("\n") if line]
+    written = "\n".join(program.iter_text()).split("\n")
+    # The program starts with "BOF", "G90" and ends with "M02", "EOF", which are not blocks.
+    assert written == lines[2:-2]
+
+
+def test_negative_zero_keeps_its_sign(tmp_path):
+    lines = [
+        "G00X-0.0Y-0.0",
+        "G41",
+        "M04",
+        "G01X-0.0Y+2.0",
+        "G02X+2.0Y-0.0I-0.0J+0.0",
+        "G01X+2.0Y-2.0",
+        "G01X-2.0Y-2.0",
+        "G01X-2.0Y-0.0",
+        "M03",
+        "G40",
+    ]
+    cam_file = tmp_path / "zero.cam"
+    cam_file.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    program = read_cam_program(cam_file, decimals=1)
+    assert program.x[0] == 0 and program.negative_zero[0].tolist() == [True, True, False, False]
+    assert "\n".join(program.iter_text()).split("\n") == lines
+    # The floats of the geometry keep the sign too, like the floats parsed from the text.
+    assert np.signbit(program.as_float().x[0])
+    assert format_fixed(0, 2, negative=True) == "-0.00"
+
+
+def test_fixed_point_fix_matches_float_fix(tmp_path, nest_file):
+    fix_cam(nest_file, tmp_path / "float.cam", workers=1)
+    fix_cam(nest_file, tmp_path / "fixed.cam", workers=1, decimals=1)
+    assert (tmp_path / "fixed.cam").read_bytes() == (tmp_path / "float.cam").read_bytes()
@@ -0,0 +1,46 @@
+"""Tests of the nesting tree: direct parents and depth parity."""
+
+from shapely.geometry import Polygon, box
+
+from camfixer.block_generator import _block_generator
+from camfixer.get_hierarchy import get_hierarchy, set_hierarchy
+
+
+def test_get_hierarchy_nested_squares():
+    # A part with a hole, a part inside the hole and a hole inside that part, plus a
+    # separate part; given in cut order, the inner contours first.
+    polygons = [box(3, 3, 7, 7), box(2, 2, 8, 8), box(1, 1, 9, 9), box(0, 0, 10, 10), box(20, 0, 30, 10)]
+    parents, depths = get_hierarchy(polygons)
+    assert parents == [1, 2, 3, None, None]
+    assert depths.tolist() == [3, 2, 1, 0, 0]
+
+
+def test_get_hierarchy_picks_the_smallest_container():
+    # Two holes side by side in a part: each one's parent is the part, not the other hole.
+    polygons = [box(0, 0, 10, 10), box(1, 1, 4, 4), box(6, 1, 9, 4), box(2, 2, 3, 3)]
+    parents, depths = get_hierarchy(polygons)
+    assert parents == [None, 0, 0, 1]
+    assert depths.tolist() == [0, 1, 1, 2]
+
+
+def test_get_hierarchy_empty_and_degenerate():
+    parents, depths = get_hierarchy([])
+    assert parents == [] and len(depths) == 0
+    parents, depths = get_hierarchy([box(0, 0, 10, 10), Polygon()])
+    assert parents == [None, None]
+    assert depths.tolist() == [0, 0]
+
+
+def test_set_hierarchy_odd_depths_are_holes(nest_file):
+    blocks = list(_block_generator(nest_file))
+    set_hierarchy(blocks)
+    by_number = {block.num_block: block for block in blocks}
+    assert any(block.depth == 2 for block in blocks)
+    for block in blocks:
+        assert block.is_piece == (block.depth % 2 == 1)
+        if block.contained_in is None:
+            assert block.depth == 0
+        else:
+            parent = by_number[block.contained_in]
+            assert block.depth == parent.depth + 1
+            assert parent.polygon.contains(block.polygon)
@@ -0,0 +1,33 @@
+"""Tests of the vectorized orientation against the per-block function it replaced."""
+
+from camfixer.cam_program import CamProgram
+from camfixer.get_orientacion import get_orientacion, get_orientacion_program
+from camfixer.segment_cam import segment_cam
+from camfixer.tessellate_arcs import get_is_circle
+
+
+def test_program_matches_per_block(nest_lines):
+    program = CamProgram.from_segments(segment_cam(nest_lines))
+    result = get_orientacion_program(program)
+
+    for block in range(program.n_blocks):
+        ncoordinates = [tuple(point) for point in program.main_coordinates(block).tolist()]
+        centro_x = sum(x for x, _ in ncoordinates) / len(ncoordinates)
+        centro_y = sum(y for _, y in ncoordinates) / len(ncoordinates)
+        assert tuple(result["centro"][block].tolist()) == (centro_x, centro_y)
+        assert result["orientacion"][block] == get_orientacion(ncoordinates, centro_x, centro_y)
+
+    # The nest has paths cut in both directions, and circles.
+    assert {"horaria", "antihoraria"} <= set(result["orientacion"].tolist())
+    assert get_is_circle(program).any()
+
+
+def test_square_in_both_directions():
+    square = ["G01X+0.0Y+0.0", "G01X+0.0Y+10.0", "G01X+10.0Y+10.0", "G01X+10.0Y+0.0", "G01X+0.0Y+0.0"]
+    segments = [
+        {"initial": [], "start": ["G41", "M04"], "arc": [], "main": main, "end": ["M03", "G40"]}
+        for main in (square, square[::-1])
+    ]
+    result = get_orientacion_program(CamProgram.from_segments(segments))
+    assert result["orientacion"].tolist() == ["horaria", "antihoraria"]
+    assert result["area"].tolist() == [-100.0, 100.0]
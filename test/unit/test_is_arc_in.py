@@ -0,0 +1,55 @@
+"""Tests of the vectorized even-odd kernel against Shapely's contains."""
+
+import numpy as np
+from shapely.geometry import Point, Polygon
+
+from camfixer.cam_program import read_cam_program
+from camfixer.is_arc_in import get_pierce_points, is_arc_in, points_in_polygons
+from camfixer.tessellate_arcs import tessellate_arcs
+
+
+def _shapely_contains(points, polygon_points, polygon_offsets):
+    return np.array(
+        [
+            len(polygon_points[start:end]) >= 3 and Polygon(polygon_points[start:end]).contains(Point(x, y))
+            for (x, y), start, end in zip(points.tolist(), polygon_offsets[:-1], polygon_offsets[1:])
+        ]
+    )
+
+
+def test_points_in_polygons_matches_shapely_on_random_points():
+    rng = np.random.default_rng(0)
+    # A concave "L", a triangle and a square, each tested many times.
+    shapes = [
+        np.array([[0, 0], [4, 0], [4, 1], [1, 1], [1, 4], [0, 4]], dtype=float),
+        np.array([[0, 0], [3, 1], [1, 3]], dtype=float),
+        np.array([[0, 0], [2, 0], [2, 2], [0, 2]], dtype=float),
+    ]
+    polygons = [shapes[index % 3] for index in range(600)]
+    polygon_points = np.concatenate(polygons)
+    polygon_offsets = np.concatenate(([0], np.cumsum([len(polygon) for polygon in polygons])))
+    points = rng.uniform(-0.5, 4.5, size=(600, 2))
+    expected = _shapely_contains(points, polygon_points, polygon_offsets)
+    np.testing.assert_array_equal(points_in_polygons(points, polygon_points, polygon_offsets), expected)
+
+
+def test_points_in_polygons_edges_and_degenerate():
+    square = np.array([[0, 0], [10, 0], [10, 10], [0, 10]], dtype=float)
+    segment = np.array([[0, 0], [10, 0]], dtype=float)
+    polygon_points = np.concatenate([square, square, square, square, segment])
+    polygon_offsets = np.array([0, 4, 8, 12, 16, 18])
+    # Inside, on an edge, on a vertex, NaN, and a polygon with only two points.
+    points = np.array([[5, 5], [10, 5], [0, 0], [np.nan, np.nan], [5, 0]], dtype=float)
+    result = points_in_polygons(points, polygon_points, polygon_offsets)
+    np.testing.assert_array_equal(result, [True, False, False, False, False])
+
+
+def test_is_arc_in_matches_shapely_on_nest(nest_file):
+    program = read_cam_program(nest_file)
+    polygon_points, polygon_offsets = tessellate_arcs(program)
+    points = get_pierce_points(program)
+    expected = _shapely_contains(points, polygon_points, polygon_offsets)
+    np.testing.assert_array_equal(is_arc_in(points, polygon_points, polygon_offsets), expected)
+    np.testing.assert_array_equal(
+        is_arc_in(points, polygon_points, polygon_offsets, engine="shapely"), expected
+    )
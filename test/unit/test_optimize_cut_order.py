@@ -0,0 +1,44 @@
+"""Tests of the cut order optimizer: shorter rapid moves, and the holes still cut before their part."""
+
+import numpy as np
+
+from camfixer.block_generator import block_generator
+from camfixer.optimize_cut_order import _block_points, optimize_cut_order, rapid_distance
+from camfixer.stage_metrics import StageMetrics
+
+
+def _rapid(blocks):
+    points = [_block_points(block) for block in blocks]
+    pierces = np.array([pierce for pierce, _ in points])
+    ends = np.array([end for _, end in points])
+    return rapid_distance(pierces, ends, np.arange(len(blocks)))
+
+
+def test_optimize_cut_order_respects_containment(nest_file):
+    blocks = list(block_generator(nest_file, workers=1))
+    metrics = StageMetrics()
+    ordered = optimize_cut_order(blocks, metrics=metrics)
+
+    assert sorted(block.num_block for block in ordered) == [block.num_block for block in blocks]
+    assert [block.num_block for block in ordered] != [block.num_block for block in blocks]
+    position = {block.num_block: index for index, block in enumerate(ordered)}
+    nested = [block for block in ordered if block.contained_in is not None]
+    assert nested
+    for block in nested:
+        assert position[block.num_block] < position[block.contained_in]
+
+    assert _rapid(ordered) <= _rapid(blocks)
+    assert metrics.counters["rapid_mm_after"] <= metrics.counters["rapid_mm_before"]
+
+
+def test_optimize_cut_order_without_two_opt_respects_containment(nest_file):
+    blocks = list(block_generator(nest_file, workers=1))
+    ordered = optimize_cut_order(blocks, passes=0)
+    position = {block.num_block: index for index, block in enumerate(ordered)}
+    for block in ordered:
+        if block.contained_in is not None:
+            assert position[block.num_block] < position[block.contained_in]
+
+
+def test_optimize_cut_order_empty():
+    assert optimize_cut_order([]) == []
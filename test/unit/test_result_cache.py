@@ -0,0 +1,82 @@
+"""Tests of the cache of fixed files: hits, keys, eviction of the least recently used and upkeep."""
+
+import os
+
+from camfixer.fix_cam import fix_cam
+from camfixer.result_cache import ResultCache
+from camfixer.stage_metrics import StageMetrics
+
+
+def _entry(cache, key, data, age):
+    """Put an entry of `data` bytes with its time set `age` seconds in the past."""
+    source = cache.directory.parent / f"{key}.src"
+    source.write_bytes(data)
+    cache.put(key, source, num_blocks=len(data))
+    os.utime(cache.directory / f"{key}.cam", (1e9 - age, 1e9 - age))
+
+
+def test_miss_then_hit_gives_the_same_bytes(tmp_path, nest_file):
+    cache = ResultCache(tmp_path / "cache")
+    first, second = StageMetrics(), StageMetrics()
+    fixed = fix_cam(nest_file, tmp_path / "first.cam", metrics=first, cache=cache, workers=1)
+    cached = fix_cam(nest_file, tmp_path / "second.cam", metrics=second, cache=cache, workers=1)
+
+    assert first.counters["cache_misses"] == 1 and "cache_hits" not in first.counters
+    assert second.counters["cache_hits"] == 1 and "cache_misses" not in second.counters
+    assert cached == fixed
+    assert (tmp_path / "second.cam").read_bytes() == (tmp_path / "first.cam").read_bytes()
+
+
+def test_key_depends_on_the_configuration(tmp_path, nest_file):
+    cache = ResultCache(tmp_path / "cache")
+    keys = {
+        cache.key(nest_file, 0.05),
+        cache.key(nest_file, 0.02),
+        cache.key(nest_file, 0.05, decimals=1),
+        cache.key(nest_file, 0.05, decimals=2),
+        cache.key(nest_file, 0.05, optimize_order=True),
+    }
+    assert len(keys) == 5
+    assert cache.key(nest_file, 0.05) == cache.key(nest_file, 0.05)
+    changed = tmp_path / "changed.cam"
+    changed.write_bytes(nest_file.read_bytes() + b"\n")
+    assert cache.key(changed, 0.05) not in keys
+
+
+def test_evict_removes_the_least_recently_used(tmp_path):
+    cache = ResultCache(tmp_path / "cache", max_bytes=10**9)
+    for age, key in enumerate(["nuevo", "medio", "viejo"]):
+        _entry(cache, key, b"x" * 100, age)
+    # Reading the oldest entry makes it the most recently used.
+    assert cache.get("viejo", tmp_path / "out.cam") == 100
+    assert (tmp_path / "out.cam").read_bytes() == b"x" * 100
+
+    cache.max_bytes = 200
+    assert cache.evict() == 1
+    assert cache.get("medio", tmp_path / "out.cam") is None
+    assert not (cache.directory / "medio.json").exists()
+    assert cache.get("nuevo", tmp_path / "out.cam") == 100
+    assert cache.get("viejo", tmp_path / "out.cam") == 100
+    assert cache.evict() == 0
+
+
+def test_put_evicts_above_max_bytes(tmp_path):
+    cache = ResultCache(tmp_path / "cache", max_bytes=250)
+    for age, key in enumerate(["a", "b", "c"]):
+        _entry(cache, key, b"x" * 100, 10 - age)
+    assert sorted(path.stem for path in cache.directory.glob("*.cam")) == ["b", "c"]
+
+
+def test_info_and_clear(tmp_path):
+    cache = ResultCache(tmp_path / "cache", max_bytes=1000)
+    _entry(cache, "a", b"x" * 100, 0)
+    _entry(cache, "b", b"x" * 50, 0)
+    assert cache.info() == {
+        "directory": str(tmp_path / "cache"),
+        "entries": 2,
+        "bytes": 150,
+        "max_bytes": 1000,
+    }
+    assert cache.clear() == 2
+    assert cache.info()["entries"] == 0
+    assert list(cache.directory.iterdir()) == []
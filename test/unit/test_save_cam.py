@@ -0,0 +1,29 @@
+"""Tests of the atomic save: the permissions of the file written."""
+
+import os
+import stat
+
+from camfixer.save_cam import save_cam
+
+
+def _mode(path):
+    return stat.S_IMODE(path.stat().st_mode)
+
+
+def test_atomic_new_file_follows_the_umask(tmp_path):
+    previous = os.umask(0o027)
+    try:
+        assert save_cam([{"text": "G00X+1.0Y+1.0"}], tmp_path / "nuevo.cam", atomic=True) == 1
+    finally:
+        os.umask(previous)
+    assert _mode(tmp_path / "nuevo.cam") == 0o640
+    assert (tmp_path / "nuevo.cam").read_text() == "BOF\nG90\nG00X+1.0Y+1.0\nM02\nEOF\n"
+
+
+def test_atomic_replace_keeps_the_permissions(tmp_path):
+    cam_file = tmp_path / "viejo.cam"
+    cam_file.write_text("viejo")
+    cam_file.chmod(0o604)
+    save_cam([], cam_file, atomic=True)
+    assert _mode(cam_file) == 0o604
+    assert [path.name for path in tmp_path.iterdir()] == ["viejo.cam"]
@@ -0,0 +1,30 @@
+"""Tests of the streaming segmenter against the split of the whole list of lines it replaced."""
+
+from camfixer.segment_cam import segment_cam
+
+
+def _old_blocks(lines):
+    """The blocks as the first _block_generator split them, from the list of non-empty lines."""
+    lines = list(filter(None, lines))
+    for index, line in enumerate(lines):
+        if line == "M04":
+            initial, start, arc = [lines[index - 2]], lines[index - 1 : index + 1], lines[index + 1 : index + 3]
+            main_start = index + 3
+        if line == "M03" and lines[index + 1] == "G40":
+            yield {
+                "initial": initial,
+                "start": start,
+                "arc": arc,
+                "main": lines[main_start:index],
+                "end": lines[index : index + 2],
+            }
+
+
+def test_segment_cam_matches_old_split(nest_lines):
+    with_blank_lines = [line for line in nest_lines for line in (line, "")]
+    assert list(segment_cam(with_blank_lines)) == list(_old_blocks(nest_lines))
+
+
+def test_segment_cam_unclosed_block():
+    lines = ["G00X+0.0Y+0.0", "G41", "M04", "G01X+1.0Y+0.0", "G03X+2.0Y+0.0I+1.5J+0.0", "G01X+3.0Y+0.0", "M03"]
+    assert list(segment_cam(lines)) == []
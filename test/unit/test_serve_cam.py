@@ -0,0 +1,114 @@
+"""Tests of the HTTP service: the fixed programs, the rejected requests and the metrics."""
+
+import http.client
+import json
+import threading
+import time
+
+import pytest
+
+from camfixer.fix_cam import fix_cam
+from camfixer.serve_cam import serve_cam
+
+
+@pytest.fixture(scope="module")
+def server():
+    """A service with one worker on a free port, shut down after the tests of the module."""
+    ready = threading.Event()
+    servers = []
+
+    def on_ready(server):
+        servers.append(server)
+        ready.set()
+
+    thread = threading.Thread(
+        target=serve_cam, kwargs=dict(port=0, workers=1, on_ready=on_ready), daemon=True
+    )
+    thread.start()
+    assert ready.wait(60)
+    yield servers[0]
+    servers[0].shutdown()
+    thread.join(60)
+
+
+def _request(server, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=60)
+    try:
+        connection.putrequest(method, path)
+        for name, value in (headers or {}).items():
+            connection.putheader(name, value)
+        connection.endheaders()
+        if body is not None:
+            connection.send(body)
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+def _chunked(data, size=1000):
+    pieces = [data[start : start + size] for start in range(0, len(data), size)]
+    return b"".join(b"%x\r\n%s\r\n" % (len(piece), piece) for piece in pieces) + b"0\r\n\r\n"
+
+
+@pytest.fixture
+def expected(tmp_path, nest_file):
+    fix_cam(nest_file, tmp_path / "expected.cam", workers=1)
+    return (tmp_path / "expected.cam").read_bytes()
+
+
+def test_fix_with_content_length(server, nest_file, expected):
+    body = nest_file.read_bytes()
+    status, fixed = _request(server, "POST", "/fix", body, {"Content-Length": str(len(body))})
+    assert status == 200
+    assert fixed == expected
+
+
+def test_fix_with_chunked_body(server, nest_file, expected):
+    status, fixed = _request(
+        server, "POST", "/fix", _chunked(nest_file.read_bytes()), {"Transfer-Encoding": "chunked"}
+    )
+    assert status == 200
+    assert fixed == expected
+
+
+@pytest.mark.parametrize("query", ["?tolerance=0", "?tolerance=-1", "?tolerance=nan", "?tolerance=abc"])
+def test_tolerance_not_positive_is_rejected(server, nest_file, query):
+    body = nest_file.read_bytes()
+    status, message = _request(server, "POST", "/fix" + query, body, {"Content-Length": str(len(body))})
+    assert status == 400
+    assert b"tolerancia" in message
+
+
+@pytest.mark.parametrize("headers", [{}, {"Content-Length": "-5"}, {"Content-Length": "mucho"}])
+def test_bad_content_length_is_rejected(server, headers):
+    status, message = _request(server, "POST", "/fix", None, headers)
+    assert status == 400
+    assert b"Content-Length" in message
+
+
+def test_bad_chunk_size_is_rejected(server):
+    status, _ = _request(server, "POST", "/fix", b"zz\r\nG00\r\n0\r\n\r\n", {"Transfer-Encoding": "chunked"})
+    assert status == 400
+
+
+def test_metrics_count_the_requests(server, nest_file):
+    _, before = _request(server, "GET", "/metrics")
+    body = nest_file.read_bytes()
+    _request(server, "POST", "/fix", body, {"Content-Length": str(len(body))})
+    _request(server, "POST", "/fix", b"zz\r\n", {"Transfer-Encoding": "chunked"})
+    # A request is counted once its answer was sent, which the client may see first.
+    deadline = time.monotonic() + 10
+    while True:
+        status, after = _request(server, "GET", "/metrics")
+        after = json.loads(after)
+        if after["in_flight"] == 0 or time.monotonic() > deadline:
+            break
+        time.sleep(0.01)
+    assert status == 200
+    before = json.loads(before)
+    assert after["requests"] == before["requests"] + 1
+    assert after["failed"] == before["failed"] + 1
+    assert after["bytes"] == before["bytes"] + len(body)
+    assert after["blocks"] > before["blocks"]
+    assert after["in_flight"] == 0
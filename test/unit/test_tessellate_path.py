@@ -0,0 +1,44 @@
+"""Tests of the chord count of the arcs and of the tessellation of one path against all the blocks at once."""
+
+import math
+
+import numpy as np
+import pytest
+
+from camfixer.cam_program import read_cam_program
+from camfixer.check_cam import _last_point
+from camfixer.segment_cam import segment_cam
+from camfixer.tessellate_arcs import tessellate_arcs
+from camfixer.tessellate_path import count_chords, tessellate_path
+
+
+def test_count_chords_keeps_the_sagitta_under_the_tolerance():
+    for radius, tolerance in [(1.0, 0.05), (50.0, 0.05), (200.0, 0.01), (1.0, 0.99)]:
+        n_chords = count_chords(radius, 2 * math.pi, tolerance)
+        assert radius * (1 - math.cos(math.pi / n_chords)) <= tolerance
+        # One chord less would not.
+        assert radius * (1 - math.cos(math.pi / (n_chords - 1))) > tolerance
+
+
+@pytest.mark.parametrize("tolerance", [1.0, 1.5, 2.0, 5.0])
+def test_count_chords_large_tolerance(tolerance):
+    assert count_chords(1.0, 2 * math.pi, tolerance) == 2
+    assert count_chords(1.0, math.pi / 2, tolerance) == 1
+    assert count_chords(0.0, math.pi, tolerance) == 1
+
+
+@pytest.mark.parametrize("tolerance", [0.0, -0.1, float("nan")])
+def test_count_chords_rejects_tolerances_that_are_not_positive(tolerance):
+    with pytest.raises(ValueError):
+        count_chords(1.0, math.pi, tolerance)
+
+
+def test_tessellate_path_matches_tessellate_arcs(nest_file):
+    program = read_cam_program(nest_file)
+    polygon_points, polygon_offsets = tessellate_arcs(program, 0.02)
+    with open(nest_file, "r", encoding="utf-8") as file:
+        for index, segment in enumerate(segment_cam(file)):
+            start = _last_point(segment["initial"] + segment["arc"])
+            points = tessellate_path(segment["main"], start, 0.02)
+            expected = polygon_points[polygon_offsets[index] : polygon_offsets[index + 1]]
+            np.testing.assert_allclose(np.array(points).reshape(-1, 2), expected, atol=1e-9)
@@ -0,0 +1,41 @@
+"""Tests of the single-pass tokenizer against the line-by-line parser it replaced."""
+
+import re
+
+import numpy as np
+
+from camfixer.tokenize_cam import tokenize_cam
+
+# The pattern of the old get_WKT and get_coordinates, searched line by line.
+OLD_PATTERN = r"G0[0123]X([+-]?\d+\.\d+)Y([+-]?\d+\.\d+)(I([+-]?\d+\.\d+))?(J([+-]?\d+\.\d+))?"
+
+
+def _old_tokens(line):
+    match = re.search(OLD_PATTERN, line)
+    if not match:
+        return None
+    x, y, _, i, _, j = match.groups()
+    return (
+        int(line[match.start() + 2]),
+        float(x),
+        float(y),
+        float(i) if i else np.nan,
+        float(j) if j else np.nan,
+    )
+
+
+def test_tokenize_cam_matches_old_parser(nest_lines):
+    lines = nest_lines + ["(comentario)", "G01X+1.0Y-2.0F500", "G02X+1.0Y-2.0I+0.5J-2.0G01X+9.9Y+9.9"]
+    tokens = tokenize_cam(lines)
+    for row, line in enumerate(lines):
+        old = _old_tokens(line)
+        if old is None:
+            assert tokens["g"][row] == -1
+            continue
+        new = (int(tokens["g"][row]),) + tuple(float(tokens[name][row]) for name in "xyij")
+        np.testing.assert_array_equal(new, old)
+
+
+def test_tokenize_cam_empty():
+    tokens = tokenize_cam([])
+    assert all(len(array) == 0 for array in tokens.values())
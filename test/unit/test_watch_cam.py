@@ -0,0 +1,56 @@
+"""Tests of the watch-folder daemon: fixed, failed and vanished files, and a clean stop."""
+
+import asyncio
+import os
+
+import camfixer.watch_cam
+from camfixer.fix_cam import fix_cam
+from camfixer.fix_cam_batch import _fix_one
+from camfixer.watch_cam import DONE_DIR, FAILED_DIR, watch_cam
+
+
+def _fix_and_remove(input_filepath, output_filepath, *args):
+    """Like _fix_one, but "bad.cam" fails and the input of "gone.cam" is removed before the daemon moves it."""
+    if input_filepath.name == "bad.cam":
+        raise ValueError("programa roto")
+    result = _fix_one(input_filepath, output_filepath, *args)
+    if input_filepath.name == "gone.cam":
+        os.remove(input_filepath)
+    return result
+
+
+async def _watch_until(inbox, outbox, names, timeout=60.0):
+    """Run the daemon until every name was moved out of the inbox, then stop it."""
+    stop = asyncio.Event()
+    daemon = asyncio.create_task(watch_cam(inbox, outbox, workers=1, poll_interval=0.05, stop=stop))
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while any((inbox / name).exists() for name in names) and loop.time() < deadline:
+        await asyncio.sleep(0.05)
+    stop.set()
+    await asyncio.wait_for(daemon, timeout)
+
+
+def test_watch_cam_fixes_fails_and_survives_a_vanished_file(tmp_path, nest_file, monkeypatch):
+    monkeypatch.setattr(camfixer.watch_cam, "_fix_one", _fix_and_remove)
+    inbox, outbox = tmp_path / "bandeja", tmp_path / "salida"
+    inbox.mkdir()
+    contents = nest_file.read_bytes()
+    # The daemon takes the files by age: the vanished one first, so the only worker has
+    # to survive it to fix the others.
+    for age, (name, data) in enumerate(
+        [("gone.cam", contents), ("a.cam", contents), ("bad.cam", contents)]
+    ):
+        (inbox / name).write_bytes(data)
+        os.utime(inbox / name, ns=(age * 10**9, age * 10**9))
+
+    asyncio.run(_watch_until(inbox, outbox, ["gone.cam", "a.cam", "bad.cam"]))
+
+    fix_cam(nest_file, tmp_path / "expected.cam", workers=1)
+    expected = (tmp_path / "expected.cam").read_bytes()
+    assert (outbox / "a.cam").read_bytes() == expected
+    assert (outbox / "gone.cam").read_bytes() == expected
+    assert sorted(path.name for path in (inbox / DONE_DIR).iterdir()) == ["a.cam"]
+    assert sorted(path.name for path in (inbox / FAILED_DIR).iterdir()) == ["bad.cam"]
+    assert not (outbox / "bad.cam").exists()
+    assert sorted(path.name for path in inbox.iterdir()) == sorted([DONE_DIR, FAILED_DIR])